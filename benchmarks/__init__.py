@@ -0,0 +1 @@
+"""Synthetic CIM models and performance benchmarks for the XML pipelines."""
@@ -0,0 +1,157 @@
+"""Synthetic RDF/XML model shaped like the NMMS CIM model.
+
+The real NMMS model can't be shared, so this writes a stand-in with the same
+structure: geographical regions, substations with voltage levels, bays of
+connectivity nodes, breakers and disconnectors with their terminals,
+ACLineSegments (and their terminals) between substations, and etx extension
+elements (settlement load zones, organisations, ownerships).  Elements are
+streamed to disk, so any size from 10k to 10M elements takes constant memory.
+
+Besides the model it can write the substation spreadsheet the
+generate_incremental scripts read (``ERCOT SUB NAME`` / ``ERCOT LOCATION``)
+and a delete file for ``modole_reduction.py``.
+
+    python -m benchmarks.generate_synthetic_cim synthetic.xml --elements 100000 \
+        --substations-csv TNMP_SUBSTATIONS.csv --delete-file delete_synthetic.xml
+"""
+import argparse
+import csv
+import random
+
+RDF_NS = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+CIM_NS = "http://iec.ch/TC57/2006/CIM-schema-cim10#"
+ETX_NS = "http://www.ercot.com/CIM11R0/2008/2.0/extension#"
+
+LOCATIONS = ["COAST", "EAST", "FAR_WEST", "NORTH", "NORTH_C", "SOUTHERN", "SOUTH_C", "WEST"]
+BASE_VOLTAGES = ["345", "138", "69"]
+VOLTAGE_LEVELS_PER_SUB = 2
+BAYS_PER_VOLTAGE_LEVEL = 3
+LINES_PER_SUB = 2
+
+# elements written per substation: substation + per voltage level (VL + per bay
+# CN, breaker, disconnector, 4 terminals, ownership) + per line (line, 2 terminals)
+ELEMENTS_PER_SUB = (1 + VOLTAGE_LEVELS_PER_SUB * (1 + BAYS_PER_VOLTAGE_LEVEL * 8)
+                    + LINES_PER_SUB * 3)
+
+HEADER = (f'<?xml version="1.0" encoding="UTF-8"?>\n'
+          f'<rdf:RDF xmlns:rdf="{RDF_NS}" xmlns:cim="{CIM_NS}" xmlns:etx="{ETX_NS}">\n')
+
+
+def _element(cls, rdf_id, literals=(), refs=()):
+    lines = [f'<{cls} rdf:ID="{rdf_id}">']
+    lines.extend(f"  <{pred}>{value}</{pred}>" for pred, value in literals)
+    lines.extend(f'  <{pred} rdf:resource="#{ref}"/>' for pred, ref in refs)
+    lines.append(f"</{cls}>\n")
+    return "\n".join(lines)
+
+
+def substation_name(s):
+    return f"SUB{s:06d}"
+
+
+def substation_location(s, n_subs):
+    """ Substations are laid out in contiguous blocks per ERCOT location """
+    return LOCATIONS[s * len(LOCATIONS) // n_subs]
+
+
+def generate(path, elements=100_000, seed=0):
+    """ Write a synthetic model of about ``elements`` elements; returns the substation count """
+    rng = random.Random(seed)
+    n_subs = max(2, elements // ELEMENTS_PER_SUB)
+    with open(path, "w", encoding="utf-8", buffering=1 << 20) as out:
+        out.write(HEADER)
+        for i, loc in enumerate(LOCATIONS):
+            out.write(_element("cim:SubGeographicalRegion", f"_SGR{i}", [("cim:IdentifiedObject.name", loc)]))
+            out.write(_element("etx:SettlementLoadZone", f"_LZ{i}", [("cim:IdentifiedObject.name", f"LZ_{loc}")]))
+        for i, kv in enumerate(BASE_VOLTAGES):
+            out.write(_element("cim:BaseVoltage", f"_BV{i}", [("cim:BaseVoltage.nominalVoltage", kv)]))
+        for i in range(10):
+            out.write(_element("etx:Organisation", f"_ORG{i}", [("cim:IdentifiedObject.name", f"TDSP{i}")]))
+
+        for s in range(n_subs):
+            loc = LOCATIONS.index(substation_location(s, n_subs))
+            out.write(_element("cim:Substation", f"_S{s}", [("cim:IdentifiedObject.name", substation_name(s))],
+                               [("cim:Substation.Region", f"_SGR{loc}"),
+                                ("etx:Substation.LoadZone", f"_LZ{loc}")]))
+            for v in range(VOLTAGE_LEVELS_PER_SUB):
+                vl = f"_VL{s}_{v}"
+                out.write(_element("cim:VoltageLevel", vl, [("cim:IdentifiedObject.name", BASE_VOLTAGES[v])],
+                                   [("cim:VoltageLevel.MemberOf_Substation", f"_S{s}"),
+                                    ("cim:VoltageLevel.BaseVoltage", f"_BV{v}")]))
+                for b in range(BAYS_PER_VOLTAGE_LEVEL):
+                    bay = f"{s}_{v}_{b}"
+                    out.write(_element("cim:ConnectivityNode", f"_CN{bay}", [],
+                                       [("cim:ConnectivityNode.MemberOf_EquipmentContainer", vl)]))
+                    for cls, tag in (("cim:Breaker", "BK"), ("cim:Disconnector", "DS")):
+                        out.write(_element(cls, f"_{tag}{bay}", [("cim:IdentifiedObject.name", f"{tag}{b}")],
+                                           [("cim:Equipment.MemberOf_EquipmentContainer", vl)]))
+                        for t in (1, 2):
+                            out.write(_element("cim:Terminal", f"_T{tag}{bay}_{t}",
+                                               [("cim:Terminal.sequenceNumber", str(t))],
+                                               [("cim:Terminal.ConductingEquipment", f"_{tag}{bay}"),
+                                                ("cim:Terminal.ConnectivityNode", f"_CN{bay}")]))
+                    out.write(_element("etx:Ownership", f"_OWN{bay}", [("etx:Ownership.percentage", "100")],
+                                       [("etx:Ownership.PowerSystemResource", f"_BK{bay}"),
+                                        ("etx:Ownership.Organisation", f"_ORG{rng.randrange(10)}")]))
+
+        # lines mostly stay within a location block, a few cross into the next one
+        block = max(1, n_subs // len(LOCATIONS))
+        for s in range(n_subs):
+            for k in range(LINES_PER_SUB):
+                if rng.random() < 0.05:
+                    other = (s + block + rng.randrange(block)) % n_subs
+                else:
+                    other = (s // block) * block + rng.randrange(block)
+                    other = other if other != s and other < n_subs else (s + 1) % n_subs
+                line = f"_L{s}_{k}"
+                out.write(_element("cim:ACLineSegment", line,
+                                   [("cim:IdentifiedObject.name", f"LN{s}_{k}"),
+                                    ("cim:Conductor.length", f"{rng.uniform(1, 80):.2f}")],
+                                   [("cim:Equipment.MemberOf_EquipmentContainer", f"_S{s}"),
+                                    ("etx:ACLineSegment.Owner", f"_ORG{rng.randrange(10)}")]))
+                for end, sub in (("a", s), ("b", other)):
+                    bay = f"{sub}_0_{rng.randrange(BAYS_PER_VOLTAGE_LEVEL)}"
+                    out.write(_element("cim:Terminal", f"_T{line}{end}", [],
+                                       [("cim:Terminal.ConductingEquipment", line),
+                                        ("cim:Terminal.ConnectivityNode", f"_CN{bay}")]))
+        out.write("</rdf:RDF>\n")
+    return n_subs
+
+
+def write_substations_csv(path, n_subs, step=4):
+    """ A TNMP_SUBSTATIONS-style sheet listing every ``step``-th substation """
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["ERCOT SUB NAME", "ERCOT LOCATION"])
+        for s in range(0, n_subs, step):
+            writer.writerow([substation_name(s), substation_location(s, n_subs)])
+
+
+def write_delete_file(path, n_subs, count=50, seed=0):
+    """ A delete file holding some terminals, whose references point into the model """
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as out:
+        out.write(HEADER)
+        for s in rng.sample(range(n_subs), min(count, n_subs)):
+            bay = f"{s}_0_0"
+            out.write(_element("cim:Terminal", f"_TBK{bay}_1", [("cim:Terminal.sequenceNumber", "1")],
+                               [("cim:Terminal.ConductingEquipment", f"_BK{bay}"),
+                                ("cim:Terminal.ConnectivityNode", f"_CN{bay}")]))
+        out.write("</rdf:RDF>\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic NMMS-shaped CIM model.")
+    parser.add_argument("output", help="model file to write")
+    parser.add_argument("--elements", type=int, default=100_000, help="approximate element count")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--substations-csv", help="also write a substation sheet (CSV)")
+    parser.add_argument("--delete-file", help="also write a delete file for modole_reduction")
+    args = parser.parse_args()
+
+    n_subs = generate(args.output, args.elements, args.seed)
+    print(f"✅ Wrote {args.output}: {n_subs} substations, ~{n_subs * ELEMENTS_PER_SUB} elements")
+    if args.substations_csv:
+        write_substations_csv(args.substations_csv, n_subs)
+    if args.delete_file:
+        write_delete_file(args.delete_file, n_subs, seed=args.seed)
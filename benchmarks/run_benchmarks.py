@@ -0,0 +1,230 @@
+"""Wall time, CPU time and peak memory of the XML pipelines on synthetic models.
+
+Each benchmark runs in a fresh process so its peak RSS is its own:
+
+    index_build        streaming parse + SQLite index build (cim_common.index)
+    load_model         the in-memory ID maps the scripts used to build (cim_common.loader)
+    compact_model      the array-backed model the batch runner and server load (cim_common.store)
+    reference_closure  modole_reduction.py's closure: compact model + component closures
+    boundary_bfs       bfs_traverse_and_break_at_boundary.py's multi-source BFS
+    incremental        generated_incremental.py's class-bucketed scans
+
+Models are generated once per size next to the results (see
+``generate_synthetic_cim.py``) and reused.  Every run appends one record to
+the JSON results file and flags benchmarks that got slower than the previous
+record for the same size.
+
+    python -m benchmarks.run_benchmarks --sizes 10000 100000 1000000
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from queue import Empty
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from benchmarks.generate_synthetic_cim import generate, write_delete_file, write_substations_csv  # noqa: E402
+from cim_common.boundary import BoundaryRegions  # noqa: E402
+from cim_common.closure import ClosureCache, read_delete_file  # noqa: E402
+from cim_common.incremental import incremental_sets  # noqa: E402
+from cim_common.index import build_index, open_index  # noqa: E402
+from cim_common.loader import load_model  # noqa: E402
+from cim_common.store import load_compact  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_WORK_DIR = os.path.join(BENCH_DIR, "data")
+DEFAULT_RESULTS = os.path.join(BENCH_DIR, "results.json")
+REGRESSION_RATIO = 1.2
+SELECTED_LOCATION = "COAST"
+
+
+def _selected_names(csv_path):
+    with open(csv_path, encoding="utf-8", newline="") as f:
+        return {row["ERCOT SUB NAME"] for row in csv.DictReader(f) if row["ERCOT LOCATION"] == SELECTED_LOCATION}
+
+
+# --- Benchmarks: each takes the model paths and returns a few counters ---
+
+def bench_index_build(paths):
+    tmp_index = paths["model"] + ".bench.sqlite"
+    try:
+        build_index(paths["model"], tmp_index)
+    finally:
+        if os.path.exists(tmp_index):
+            os.remove(tmp_index)
+    return {}
+
+
+def bench_load_model(paths):
+    model = load_model(paths["model"])
+    return {"elements": len(model)}
+
+
+def bench_compact_model(paths):
+    model = load_compact(paths["model"])
+    return {"elements": len(model), "array_bytes": model.nbytes()}
+
+
+def bench_reference_closure(paths):
+    existing_ids, referenced_ids = read_delete_file(paths["delete"])
+    closures = ClosureCache(load_compact(paths["model"]), cache=False)  # time the component build too
+    injected, not_found = closures.reference_closure(existing_ids, referenced_ids - existing_ids)
+    return {"injected": len(injected), "not_found": len(not_found)}
+
+
+def bench_boundary_bfs(paths):
+    with open_index(paths["model"]) as model_index:
+        regions = BoundaryRegions(model_index, cache=False)
+        ids = regions.region_ids(regions.substation_ids(_selected_names(paths["substations"])))
+    return {"boundary": len(regions.boundary), "selected": len(ids)}
+
+
+def bench_incremental(paths):
+    with open_index(paths["model"]) as model_index:
+        sets = incremental_sets(model_index, _selected_names(paths["substations"]), verbose=False)
+    return {name: len(ids) for name, ids in sets.items()}
+
+
+BENCHMARKS = {
+    "index_build": bench_index_build,
+    "load_model": bench_load_model,
+    "compact_model": bench_compact_model,
+    "reference_closure": bench_reference_closure,
+    "boundary_bfs": bench_boundary_bfs,
+    "incremental": bench_incremental,
+}
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KiB elsewhere
+
+
+def _run_one(name, paths, trace, queue):
+    """ Child process: run one benchmark and report its measurements """
+    if trace:
+        tracemalloc.start()
+    wall, cpu = time.perf_counter(), time.process_time()
+    counters = BENCHMARKS[name](paths)
+    result = {
+        "wall_s": round(time.perf_counter() - wall, 4),
+        "cpu_s": round(time.process_time() - cpu, 4),
+        "peak_rss_mb": _peak_rss_mb(),
+        "counters": counters,
+    }
+    if trace:
+        result["tracemalloc_peak_mb"] = tracemalloc.get_traced_memory()[1] / (1 << 20)
+    queue.put(result)
+
+
+def run_isolated(name, paths, trace=False):
+    """ Measurements of one benchmark in a fresh process, or {"failed": exit code} if it died """
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_run_one, args=(name, paths, trace, queue))
+    proc.start()
+    result = None
+    while result is None:
+        try:
+            result = queue.get(timeout=1)
+        except Empty:
+            if not proc.is_alive():
+                try:  # it may have reported just before exiting
+                    result = queue.get(timeout=1)
+                except Empty:
+                    break
+    proc.join()
+    return result if result is not None else {"failed": proc.exitcode}
+
+
+def prepare(size, work_dir, seed=0):
+    """ Generate (or reuse) the model, substation sheet and delete file for ``size`` """
+    os.makedirs(work_dir, exist_ok=True)
+    stem = os.path.join(work_dir, f"synthetic_{size}_{seed}")
+    paths = {"model": stem + ".xml", "substations": stem + "_substations.csv", "delete": stem + "_delete.xml"}
+    if not all(os.path.exists(p) for p in paths.values()):
+        print(f"🔨 Generating {size}-element model...")
+        n_subs = generate(paths["model"], size, seed)
+        write_substations_csv(paths["substations"], n_subs)
+        write_delete_file(paths["delete"], n_subs, seed=seed)
+    with open_index(paths["model"]):  # built outside the timed phases that only query it
+        pass
+    return paths
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _previous(history, size):
+    for record in reversed(history):
+        if size in record["sizes"]:
+            return record["sizes"][size]
+    return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the CIM XML pipelines on synthetic models.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000],
+                        help="element counts to generate and benchmark")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="benchmarks to run")
+    parser.add_argument("--work-dir", default=DEFAULT_WORK_DIR, help="where generated models are kept")
+    parser.add_argument("--results", default=DEFAULT_RESULTS, help="JSON file results are appended to")
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="also record Python allocation peaks (slows everything down)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    history = []
+    if os.path.exists(args.results):
+        with open(args.results, encoding="utf-8") as f:
+            history = json.load(f)
+
+    record = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "sizes": {},
+    }
+    for size in args.sizes:
+        paths = prepare(size, args.work_dir, args.seed)
+        key = str(size)
+        previous = _previous(history, key) or {}
+        record["sizes"][key] = {"model_bytes": os.path.getsize(paths["model"])}
+        for name in args.only or BENCHMARKS:
+            result = run_isolated(name, paths, args.tracemalloc)
+            record["sizes"][key][name] = result
+            if "failed" in result:
+                print(f"❌  {size:>10} {name:<18} failed (exit code {result['failed']})")
+                continue
+            rss = f"{result['peak_rss_mb']:.0f} MB" if result["peak_rss_mb"] is not None else "n/a"
+            flag = ""
+            before = previous.get(name)
+            if before and "wall_s" in before and result["wall_s"] > before["wall_s"] * REGRESSION_RATIO:
+                flag = f"  ⚠️  slower than {before['wall_s']:.2f}s"
+            print(f"⏱️  {size:>10} {name:<18} {result['wall_s']:8.2f}s wall "
+                  f"{result['cpu_s']:8.2f}s cpu {rss:>9} peak{flag}")
+
+    history.append(record)
+    with open(args.results, "w", encoding="utf-8") as f:
+        json.dump(history, f, indent=2)
+    print(f"💾 Results appended to {args.results}")
@@ -0,0 +1 @@
+"""Shared helpers for the NMMS CIM XML scripts."""
@@ -0,0 +1,71 @@
+"""Substation regions broken at boundaries.
+
+The model behind ``bfs_traverse_and_break_at_boundary.py``: every substation
+seeds a multi-source BFS over the reference graph (``graph.label_origins``);
+an element belongs to the region of its only origin substation, and boundary
+elements reached from several substations belong to each of them.  The
+labels are computed once per model and saved next to it (see ``labels``), so
+the next run -- or next month's update -- starts from them; the region of
+any set of substations, or of every group of them at once, is then selected
+from the labels.
+"""
+import numpy as np
+
+from cim_common.graph import build_graph, select_region
+from cim_common.labels import compute_labels, labels_path_for, load_labels
+
+
+def substation_names(model_index):
+    """ {rdf:ID: name} of the named substations, the origins of the labels """
+    names = {}
+    for rid, (name, _) in model_index.scan_classes(["cim:Substation"])["cim:Substation"].items():
+        if rid and name:
+            names[rid] = name
+    return names
+
+
+class BoundaryRegions:
+    """ Origin labels of every element of one model index """
+
+    def __init__(self, model_index, graph=None, workers=None, cache=True):
+        self.model_index = model_index
+        self.graph = graph if graph is not None else build_graph(model_index)
+
+        # --- Identify all substations and map IDs to names ---
+        self.sub_id_to_name = substation_names(model_index)
+
+        # --- Multi-source BFS: label origins for each node ---
+        # Every substation seeds its own origin; a node is unreached, owned by
+        # one origin, or a boundary (>= 2 origins) that stops propagating.
+        # With several workers the levels after the warm-up run per component.
+        self.source_ids = sorted(self.sub_id_to_name)
+        model_path = getattr(model_index, "model_path", None)
+        cache = cache and model_path is not None
+        state = load_labels(model_path) if cache else None
+        if state is None or state.source_ids != self.source_ids or len(state.ids) != len(self.graph):
+            state = compute_labels(self.graph, self.source_ids, workers)
+            if cache:
+                state.save(labels_path_for(model_path), model_path)
+        self.labels = state
+        self.label, self.boundary = state.label, state.boundary
+
+    def substation_ids(self, names):
+        """ rdf:IDs of the model substations named in ``names`` """
+        names = set(names)
+        return {sid for sid, name in self.sub_id_to_name.items() if name in names}
+
+    def region_ids(self, sub_ids):
+        """
+        rdf:IDs unique to one of ``sub_ids``, plus the boundary elements that
+        touch any of them.
+        """
+        sub_ids = set(sub_ids)
+        mask = np.array([sid in sub_ids for sid in self.source_ids], dtype=bool)
+        return set(self.graph.to_ids(select_region(self.label, self.boundary, mask)))
+
+    def group_region_ids(self, groups):
+        """
+        ``{key: region_ids(sub_ids)}`` for every ``key: sub_ids`` of ``groups``
+        (e.g. one per ERCOT location), all selected from the same labels.
+        """
+        return {key: self.region_ids(sub_ids) for key, sub_ids in groups.items()}
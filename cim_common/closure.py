@@ -0,0 +1,296 @@
+"""Reference closure of a delete/incremental file against the CIM model.
+
+A delete file references IDs it does not define; ``reference_closure`` pulls
+those elements -- and everything they reference in turn -- out of the model
+index, level by level, exactly as ``modole_reduction.py`` reports it.
+``ClosureCache`` answers the same question from closures cached per strongly
+connected component of the reference graph, so several delete files (or
+jobs) against one model share the work.
+"""
+import os
+import xml.etree.ElementTree as ET
+from collections import deque
+
+import numpy as np
+
+from cim_common.graph import strongly_connected
+from cim_common.index import model_fingerprint
+from cim_common.instrument import metrics
+from cim_common.loader import RDF_ID, get_id, opened
+from cim_common.offsets import scan_spans
+from cim_common.writer import RdfWriter
+
+
+def read_delete_file(path):
+    """ (defined IDs, referenced IDs) of a delete/incremental file, streamed """
+    existing_ids = set()
+    referenced_ids = set()
+    with opened(path) as f:
+        for _, el in ET.iterparse(f, events=("end",)):
+            rid = el.get(RDF_ID)
+            if rid:
+                existing_ids.add(rid)
+            for attr, val in el.attrib.items():
+                if attr.endswith("resource"):
+                    ref = get_id(val)
+                    if ref:
+                        referenced_ids.add(ref)
+    return existing_ids, referenced_ids
+
+
+def reference_closure(model_index, existing_ids, missing_ids, verbose=True):
+    """
+    BFS from ``missing_ids`` over the model's references, skipping IDs that
+    are already defined.  Returns ``(injected, not_found)``.
+    """
+    existing_ids = set(existing_ids)
+    queue = deque(sorted(missing_ids))
+    injected = set()
+    not_found = set()
+    level = 0
+
+    while queue:
+        level_size = len(queue)
+        level_injected = 0
+        if verbose:
+            print(f"\n🌊 BFS level {level}: {level_size} IDs in queue")
+
+        with metrics.phase("closure_level", level=level, queued=level_size) as phase:
+            for _ in range(level_size):
+                rid = queue.popleft()
+                if rid in existing_ids or rid in injected or rid in not_found:
+                    continue
+
+                metrics.count("elements_visited")
+                src_refs = model_index.refs(rid)
+                if src_refs is None:
+                    not_found.add(rid)
+                    metrics.count("not_found")
+                    continue
+
+                injected.add(rid)
+                existing_ids.add(rid)
+                level_injected += 1
+
+                # queue up any new references found in the injected element
+                metrics.count("references_followed", len(src_refs))
+                for _, ref2 in src_refs:
+                    if ref2 not in existing_ids and ref2 not in injected and ref2 not in not_found:
+                        queue.append(ref2)
+            phase.fields["injected"] = level_injected
+
+        if verbose:
+            print(f"✅ Injected in level {level}: {level_injected}")
+        level += 1
+
+    return injected, not_found
+
+
+def closure_path_for(model_path):
+    return f"{model_path}.scc.npz"
+
+
+def _merge_ranges(ranges):
+    """ Sorted, disjoint [lo, hi) ranges covering the (k, 2) array ``ranges`` """
+    ranges = ranges[np.argsort(ranges[:, 0], kind="stable")]
+    hi = np.maximum.accumulate(ranges[:, 1])
+    new = np.ones(len(ranges), dtype=bool)
+    new[1:] = ranges[1:, 0] > hi[:-1]
+    last = np.append(np.flatnonzero(new)[1:] - 1, len(ranges) - 1)
+    return np.stack([ranges[new, 0], hi[last]], axis=1)
+
+
+def _load_components(path, model):
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            if (str(data["fingerprint"]) == model_fingerprint(model.model_path)
+                    and len(data["comp"]) == len(model.ids)):
+                return data["comp"]
+    except (OSError, KeyError, ValueError):
+        pass
+    return None
+
+
+class ClosureCache:
+    """
+    Reference closures over one model, from its strongly connected components.
+
+    The components of the forward reference graph are computed once per model
+    (Tarjan, saved next to the model as ``<model>.scc.npz`` and reused until
+    the model file changes).  A component's closure -- itself plus the
+    closures of the components it references -- is kept as a few ranges of
+    component numbers: Tarjan closes the components of one DFS subtree
+    contiguously, and the elements are stored sorted by component, so each
+    range is also one slice of elements.  ``closure_of`` / ``closure`` union
+    the cached ranges instead of walking the references again.
+
+    Unlike ``reference_closure`` the walk of ``closure`` does not stop at IDs
+    the delete file already defines -- their model references are followed
+    too; ``reference_closure`` on the cache keeps the module function's
+    semantics.
+    """
+
+    def __init__(self, model_index, cache=True):
+        if not hasattr(model_index, "ref_indptr"):
+            from cim_common.store import CompactModel  # store builds on the index
+            model_index = CompactModel.from_index(model_index)
+        self.model_index = model_index
+        self.hits = 0
+        self._closures = {}  # component -> (k, 2) array of component ranges
+
+        model = model_index
+        n = len(model.ids)
+        indptr = np.concatenate([model.ref_indptr, np.full(n - model.n_defined, model.ref_indptr[-1])])
+        path = closure_path_for(model.model_path) if cache and model.model_path else None
+        comp = _load_components(path, model) if path else None
+        if comp is None:
+            with metrics.phase("closure_components", nodes=n):
+                comp = strongly_connected(n, indptr, model.ref_dst.astype(np.int64))
+            if path:
+                with open(path + ".tmp", "wb") as f:
+                    np.savez(f, fingerprint=np.array(model_fingerprint(model.model_path)), comp=comp)
+                os.replace(path + ".tmp", path)
+        self.comp = comp
+        n_comp = int(comp.max()) + 1 if n else 0
+
+        # elements grouped by component, and the component (DAG) successors
+        self.members = np.argsort(comp, kind="stable")
+        self.member_indptr = np.zeros(n_comp + 1, dtype=np.int64)
+        np.cumsum(np.bincount(comp, minlength=n_comp), out=self.member_indptr[1:])
+        src = comp[np.repeat(np.arange(n, dtype=np.int64), np.diff(indptr))]
+        dst = comp[model.ref_dst]
+        edges = np.unique(src[src != dst] * n_comp + dst[src != dst])
+        self.succ_indptr = np.zeros(n_comp + 1, dtype=np.int64)
+        np.cumsum(np.bincount(edges // max(n_comp, 1), minlength=n_comp), out=self.succ_indptr[1:])
+        self.succ = edges % max(n_comp, 1)
+
+    def _component_closure(self, c):
+        """ Ranges of the components reachable from component ``c`` (memoized) """
+        known = self._closures.get(c)
+        if known is not None:
+            self.hits += 1
+            return known
+        stack = [c]
+        while stack:
+            x = stack[-1]
+            if x in self._closures:
+                stack.pop()
+                continue
+            succ = self.succ[self.succ_indptr[x]:self.succ_indptr[x + 1]].tolist()
+            pending = [s for s in succ if s not in self._closures]
+            if pending:
+                stack.extend(pending)
+                continue
+            self.hits += len(succ)
+            parts = [np.array([[x, x + 1]], dtype=np.int64)] + [self._closures[s] for s in succ]
+            self._closures[x] = _merge_ranges(np.concatenate(parts))
+            stack.pop()
+        return self._closures[c]
+
+    def _nodes(self, ranges):
+        """ Element ints in the component ``ranges`` """
+        lo = self.member_indptr[ranges[:, 0]]
+        hi = self.member_indptr[ranges[:, 1]]
+        return np.concatenate([self.members[a:b] for a, b in zip(lo.tolist(), hi.tolist())])
+
+    def _split(self, nodes):
+        """ (rdf:IDs defined in the model, unresolved rdf:IDs) of ``nodes`` """
+        model = self.model_index
+        ids = model.ids.to_ids(nodes)
+        defined = (nodes < model.n_defined).tolist()
+        return ({rid for rid, d in zip(ids, defined) if d},
+                {rid for rid, d in zip(ids, defined) if not d})
+
+    def _targets(self, nodes):
+        """ Reference targets of the defined ``nodes``, once each """
+        model = self.model_index
+        starts, ends = model.ref_indptr[nodes], model.ref_indptr[nodes + 1]
+        metrics.count("references_followed", int((ends - starts).sum()))
+        parts = [model.ref_dst[a:b] for a, b in zip(starts.tolist(), ends.tolist())]
+        return np.unique(np.concatenate(parts)).astype(np.int64) if parts else np.zeros(0, dtype=np.int64)
+
+    def _closure_nodes(self, nodes):
+        metrics.count("elements_visited", len(nodes))
+        comps = np.unique(self.comp[nodes]).tolist()
+        if not comps:
+            return np.zeros(0, dtype=np.int64)
+        return self._nodes(_merge_ranges(np.concatenate([self._component_closure(c) for c in comps])))
+
+    def closure_of(self, rdf_id):
+        """ (frozenset found, frozenset unresolved) reachable from ``rdf_id`` """
+        node = self.model_index.ids.get(rdf_id)
+        if node is None:
+            metrics.count("not_found")
+            return frozenset(), frozenset([rdf_id])
+        found, unresolved = self._split(self._closure_nodes(np.array([node], dtype=np.int64)))
+        return frozenset(found), frozenset(unresolved)
+
+    def closure(self, existing_ids, missing_ids):
+        """ Same shape as ``reference_closure``: ``(injected, not_found)`` """
+        missing_ids = list(missing_ids)
+        nodes = self.model_index.ids.lookup(missing_ids)
+        unknown = {rid for rid, node in zip(missing_ids, nodes.tolist()) if node < 0}
+        injected, not_found = self._split(self._closure_nodes(nodes[nodes >= 0]))
+        metrics.count("not_found", len(unknown))
+        return injected - set(existing_ids), not_found | unknown
+
+    def reference_closure(self, existing_ids, missing_ids, verbose=False):
+        """
+        ``reference_closure`` (IDs in ``existing_ids`` are neither injected
+        nor followed) answered from the cached closures: an ID whose whole
+        closure avoids ``existing_ids`` takes it at once, the others are
+        walked one reference at a time.  ``verbose`` runs the level-by-level
+        walk instead, for its per-level report.
+        """
+        if verbose:
+            return reference_closure(self.model_index, existing_ids, missing_ids, verbose)
+        model = self.model_index
+        existing_ids = set(existing_ids)
+        blocked = np.zeros(len(self.member_indptr), dtype=np.int64)
+        existing = model.ids.lookup(list(existing_ids))
+        np.cumsum(np.bincount(self.comp[existing[existing >= 0]], minlength=len(blocked) - 1),
+                  out=blocked[1:])
+
+        seen = np.zeros(len(model.ids), dtype=bool)
+        seen[existing[existing >= 0]] = True
+        missing_ids = [rid for rid in missing_ids if rid not in existing_ids]
+        nodes = model.ids.lookup(missing_ids)
+        not_found = {rid for rid, node in zip(missing_ids, nodes.tolist()) if node < 0}
+        reached = []
+        queue = np.unique(nodes[nodes >= 0])
+        while queue.size:
+            walk = []
+            for node in queue.tolist():
+                if seen[node]:
+                    continue
+                ranges = self._component_closure(int(self.comp[node]))
+                if (blocked[ranges[:, 1]] - blocked[ranges[:, 0]]).any():
+                    seen[node] = True
+                    walk.append(node)  # reaches an existing ID: follow it one step
+                else:
+                    whole = self._nodes(ranges)
+                    reached.append(whole[~seen[whole]])
+                    seen[whole] = True
+            walk = np.array(walk, dtype=np.int64)
+            reached.append(walk)
+            queue = self._targets(walk[walk < model.n_defined])
+        reached = np.concatenate(reached) if reached else np.zeros(0, dtype=np.int64)
+        metrics.count("elements_visited", len(reached))
+        injected, unresolved = self._split(reached)
+        metrics.count("not_found", len(unresolved | not_found))
+        return injected, unresolved | not_found
+
+
+def write_closure_output(output_file, delete_file, model_index, injected):
+    """
+    Stream the delete-file elements followed by the injected model elements
+    to ``output_file``; returns the writer's namespace map.
+    """
+    delete_nsmap = {}
+    delete_spans = [(start, end) for _, start, end in scan_spans(delete_file, delete_nsmap)]
+    writer = RdfWriter(output_file, delete_nsmap)
+    writer.add_namespaces(model_index.nsmap, model_index.model_path)
+    with writer:
+        writer.copy_spans(delete_file, delete_spans)
+        writer.copy_spans(model_index.model_path, model_index.spans(injected))
+    return writer.nsmap
@@ -0,0 +1,175 @@
+"""Columnar (Parquet/Feather) export of the CIM model.
+
+One streaming pass over the model writes three tables next to it::
+
+    elements    id, class, name, start, end     (start/end: byte span in the model)
+    references  src, predicate, dst
+    literals    id, predicate, value
+
+Loading them back into pandas (``open_tables``) takes a fraction of an XML
+parse, for analysis over whole columns.  The element selections of the
+scripts stay in ``incremental``, ``boundary`` and ``closure``, over the
+model index and ``CompactModel``.
+
+    python -m cim_common.columnar NMMS_Model_CIM_Mar_ML1_1_03112025.xml --format parquet
+
+pyarrow (and pandas for reading) are only imported when used.
+"""
+import argparse
+import json
+import os
+
+from cim_common.index import model_fingerprint
+from cim_common.parallel import records_with_spans
+
+TABLES_VERSION = "1"
+BATCH_SIZE = 100_000
+FORMATS = {"parquet": ".parquet", "feather": ".feather"}
+CATEGORY_COLUMNS = {"elements": ["class"], "references": ["predicate"], "literals": ["predicate"]}
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+    except ImportError as exc:
+        raise ImportError("The columnar export needs pyarrow: pip install pyarrow") from exc
+    return pa
+
+
+def tables_dir_for(model_path):
+    """ Default folder of the tables of ``model_path`` (next to it) """
+    return os.path.splitext(model_path)[0] + ".tables"
+
+
+def _schemas(pa):
+    return {
+        "elements": pa.schema([("id", pa.string()), ("class", pa.string()), ("name", pa.string()),
+                               ("start", pa.int64()), ("end", pa.int64())]),
+        "references": pa.schema([("src", pa.string()), ("predicate", pa.string()), ("dst", pa.string())]),
+        "literals": pa.schema([("id", pa.string()), ("predicate", pa.string()), ("value", pa.string())]),
+    }
+
+
+class _TableWriter:
+    """ Batched writer of one table as Parquet or Feather (Arrow IPC) """
+
+    def __init__(self, pa, path, schema, fmt):
+        self.pa = pa
+        self.schema = schema
+        self.rows = {name: [] for name in schema.names}
+        self.pending = 0
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+            self.writer = pq.ParquetWriter(path, schema)
+        else:
+            self.writer = pa.ipc.new_file(path, schema)
+
+    def append(self, *row):
+        for column, value in zip(self.rows.values(), row):
+            column.append(value)
+        self.pending += 1
+        if self.pending >= BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.writer.write_batch(self.pa.RecordBatch.from_pydict(self.rows, schema=self.schema))
+        for column in self.rows.values():
+            column.clear()
+        self.pending = 0
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+def export_tables(model_path, out_dir=None, fmt="parquet", workers=None):
+    """ Stream ``model_path`` once into the three tables; returns the folder """
+    pa = _pyarrow()
+    out_dir = out_dir or tables_dir_for(model_path)
+    os.makedirs(out_dir, exist_ok=True)
+    ext = FORMATS[fmt]
+
+    writers = {name: _TableWriter(pa, os.path.join(out_dir, name + ext), schema, fmt)
+               for name, schema in _schemas(pa).items()}
+    nsmap = {}
+    count = 0
+    for rec, start, end in records_with_spans(model_path, nsmap, workers):
+        writers["elements"].append(rec.rdf_id, rec.cls, rec.name, start, end)
+        for pred, dst in rec.refs:
+            writers["references"].append(rec.rdf_id, pred, dst)
+        for pred, value in rec.literals:
+            writers["literals"].append(rec.rdf_id, pred, value)
+        count += 1
+    for writer in writers.values():
+        writer.close()
+
+    with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"version": TABLES_VERSION, "format": fmt, "elements": count, "nsmap": nsmap,
+                   "model_path": os.path.abspath(model_path),
+                   "fingerprint": model_fingerprint(model_path)}, f, indent=2)
+    return out_dir
+
+
+def _tables_are_current(out_dir, model_path, fmt):
+    try:
+        with open(os.path.join(out_dir, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return (meta.get("version") == TABLES_VERSION and meta.get("format") == fmt
+            and meta.get("fingerprint") == model_fingerprint(model_path))
+
+
+def open_tables(model_path, out_dir=None, fmt="parquet", rebuild=False):
+    """ The ModelTables of ``model_path``, exporting them first if they are stale """
+    out_dir = out_dir or tables_dir_for(model_path)
+    if rebuild or not _tables_are_current(out_dir, model_path, fmt):
+        print(f"🔨 Exporting tables for {model_path} ...")
+        export_tables(model_path, out_dir, fmt)
+    return ModelTables(out_dir, model_path)
+
+
+class ModelTables:
+    """ The exported tables as pandas DataFrames, each read on first use """
+
+    def __init__(self, tables_dir, model_path=None):
+        self.tables_dir = tables_dir
+        self.model_path = model_path
+        with open(os.path.join(tables_dir, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.nsmap = self.meta["nsmap"]
+        self._frames = {}
+
+    def _read(self, name):
+        if name not in self._frames:
+            import pandas as pd
+            path = os.path.join(self.tables_dir, name + FORMATS[self.meta["format"]])
+            df = pd.read_parquet(path) if self.meta["format"] == "parquet" else pd.read_feather(path)
+            for column in CATEGORY_COLUMNS[name]:
+                df[column] = df[column].astype("category")
+            self._frames[name] = df
+        return self._frames[name]
+
+    @property
+    def elements(self):
+        return self._read("elements")
+
+    @property
+    def references(self):
+        return self._read("references")
+
+    @property
+    def literals(self):
+        return self._read("literals")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a CIM model to Parquet/Feather tables.")
+    parser.add_argument("model", help="NMMS CIM XML file")
+    parser.add_argument("--out", help="output folder (default: <model>.tables next to the model)")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="parquet")
+    parser.add_argument("--workers", type=int, help="parser processes (default: CIM_WORKERS or all cores)")
+    args = parser.parse_args()
+    out_dir = export_tables(args.model, args.out, args.format, args.workers)
+    print(f"✅ Tables written to {out_dir}")
@@ -0,0 +1,153 @@
+"""Per-component parallel execution of the boundary-breaking BFS.
+
+Label propagation only ever moves through nodes that are still unreached, and
+a node never propagates again once it has been expanded or turned into a
+boundary.  So after the first few levels have been run over the whole graph
+(which is where the shared hubs -- regions, load zones, base voltages,
+organisations -- become boundary nodes), the rest of the work splits exactly
+along the connected components of the *still active* nodes (the frontier
+plus the unreached nodes).  Each component, together with the already
+labeled nodes around it, is propagated on its own in a process pool, and the
+results are merged: component nodes are disjoint, and the labeled nodes they
+touch only gain origins, which are unioned.
+
+The merged ``(label, boundary)`` is identical to ``graph.label_origins``;
+wall time follows the largest component instead of the whole model.
+``labels.compute_labels`` drives the warm-up and the pool, and the same split
+lets ``labels.repair_labels`` rerun only the components a model update
+touched.
+"""
+import heapq
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from cim_common.graph import BOUNDARY, NO_ORIGIN, _label_level
+from cim_common.instrument import metrics
+from cim_common.parallel import _fork_context
+
+WARMUP_LEVELS = 4
+GROUPS_PER_WORKER = 4
+
+_shared = {}  # graph and level state handed to forked workers
+
+
+def connected_components(n, src, dst):
+    """ Component root (smallest member) of each of ``n`` nodes joined by edges ``src``-``dst`` """
+    comp = np.arange(n, dtype=np.int64)
+    while True:
+        cs, cd = comp[src], comp[dst]
+        differ = cs != cd
+        if not differ.any():
+            return comp
+        # hook the larger root under the smaller one, then compress the paths
+        np.minimum.at(comp, np.maximum(cs, cd)[differ], np.minimum(cs, cd)[differ])
+        while True:
+            jumped = comp[comp]
+            if np.array_equal(jumped, comp):
+                break
+            comp = jumped
+
+
+def worker_count():
+    """ ``CIM_WORKERS`` if set, else every core where workers can be forked, else 1 """
+    if os.environ.get("CIM_WORKERS"):
+        return max(1, int(os.environ["CIM_WORKERS"]))
+    return (os.cpu_count() or 1) if _fork_context() is not None else 1
+
+
+def _groups(comp, frontier, n_groups):
+    """ Frontier nodes split into ``n_groups`` sets of whole components, balanced by size """
+    roots, sizes = np.unique(comp, return_counts=True)
+    size_of = dict(zip(roots.tolist(), sizes.tolist()))
+    frontier_roots = comp[frontier]
+    wanted = np.unique(frontier_roots).tolist()
+    # largest components first, each onto the currently lightest group
+    heap = [(0, g) for g in range(n_groups)]
+    group_of = {}
+    for root in sorted(wanted, key=size_of.get, reverse=True):
+        load, g = heapq.heappop(heap)
+        group_of[root] = g
+        heapq.heappush(heap, (load + size_of[root], g))
+    assigned = np.array([group_of[r] for r in frontier_roots.tolist()], dtype=np.int64)
+    groups = [frontier[assigned == g] for g in range(n_groups)]
+    largest = max(size_of[r] for r in wanted) if wanted else 0
+    return [g for g in groups if g.size], len(wanted), largest
+
+
+def _run_group(g):
+    """
+    Propagate one group to the end; returns (touched nodes, their labels,
+    their boundary sets, their owners or None).
+    """
+    graph, label, boundary = _shared["graph"], _shared["label"], _shared["boundary"]
+    n_sources, level, owner = _shared["n_sources"], _shared["level"], _shared["owner"]
+    frontier = _shared["groups"][g]
+    touched = [frontier]
+    while frontier.size:
+        with metrics.phase("label_level", level=level, frontier=int(frontier.size), group=g):
+            frontier, changed = _label_level(graph, label, boundary, frontier, n_sources, owner)
+        touched.append(changed)
+        level += 1
+    nodes = np.unique(np.concatenate(touched))
+    labels = label[nodes]
+    sets = {node: boundary[node] for node in nodes[labels == BOUNDARY].tolist()}
+    return nodes, labels, sets, None if owner is None else owner[nodes]
+
+
+def active_components(graph, label, frontier):
+    """
+    (active, comp) after a warm-up: ``active`` marks the frontier and the
+    still unreached nodes, ``comp`` is the component root of every node over
+    the edges between active nodes.
+    """
+    active = label == NO_ORIGIN
+    active[frontier] = True
+    src = np.repeat(np.arange(len(graph), dtype=np.int64), np.diff(graph.indptr))
+    both = active[src] & active[graph.indices]
+    return active, connected_components(len(graph), src[both], graph.indices[both])
+
+
+def run_components(graph, label, boundary, frontier, active, comp, n_sources, level,
+                   workers=None, owner=None):
+    """
+    Propagate from ``frontier`` (whole active components of ``comp``) to the
+    end over ``workers`` processes and merge the results into ``label`` and
+    ``boundary`` in place; ``owner`` is filled as by ``graph.propagate``.
+    """
+    workers = worker_count() if workers is None else workers
+    groups, n_components, largest = _groups(comp, frontier, max(1, workers * GROUPS_PER_WORKER))
+    metrics.count("components", n_components)
+
+    _shared.update(graph=graph, label=label, boundary=boundary, n_sources=n_sources,
+                   level=level, groups=groups, owner=owner)
+    try:
+        context = _fork_context()
+        with metrics.phase("component_labels", components=n_components, largest=largest,
+                           groups=len(groups), workers=workers):
+            if workers > 1 and context is not None:
+                with ProcessPoolExecutor(workers, mp_context=context) as pool:
+                    # workers change forked copies; the parent's arrays stay at the warm-up state
+                    results = list(pool.map(_run_group, range(len(groups))))
+            else:  # in-process, one group after another, on the shared arrays
+                results = [_run_group(g) for g in range(len(groups))]
+    finally:
+        _shared.clear()
+
+    # --- merge: active nodes belong to one group; labeled nodes only gain origins ---
+    for nodes, labels, sets, owners in results:
+        own = active[nodes]
+        label[nodes[own]] = labels[own]
+        if owner is not None:
+            owner[nodes[own]] = owners[own]
+        for node in nodes[own & (labels == BOUNDARY)].tolist():
+            boundary[node] = sets[node]
+        for node, new in zip(nodes[~own].tolist(), labels[~own].tolist()):
+            if new != BOUNDARY:
+                continue
+            if label[node] >= 0:
+                boundary[node] = {int(label[node])}
+                label[node] = BOUNDARY
+            boundary[node] |= sets[node]
+
@@ -0,0 +1,126 @@
+"""Transparent compressed I/O for CIM models, delete files and outputs.
+
+Every path ending in ``.gz``, ``.bz2``, ``.xz`` or ``.zst`` is read and
+written through the matching (de)compressor, with large buffers on both
+sides; any other path is a plain file.  A model kept compressed at ~10:1 is
+streamed through the decompressor without ever being unpacked on disk.
+
+Plain files are still read through ``mmap`` wherever byte ranges are sliced
+out of the model.  A compressed file can only be read forward, so
+``SpanReader`` serves sorted byte ranges in one sequential pass (and starts
+over from the top only when asked to go back).
+
+The compression level of outputs is the format's default unless ``level`` or
+``CIM_COMPRESS_LEVEL`` says otherwise.  zstandard (``.zst``) is optional and
+only imported when a ``.zst`` path is used.
+"""
+import bz2
+import gzip
+import io
+import lzma
+import mmap
+import os
+
+READ_BUFFER = 4 << 20
+WRITE_BUFFER = 4 << 20
+DEFAULT_LEVELS = {".gz": 6, ".bz2": 9, ".xz": 6, ".zst": 3}
+
+
+def compression_of(path):
+    """ The compressed suffix of ``path`` (".gz", ".bz2", ".xz", ".zst"), or None """
+    suffix = os.path.splitext(str(path))[1].lower()
+    return suffix if suffix in DEFAULT_LEVELS else None
+
+
+def is_compressed(path):
+    return compression_of(path) is not None
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError as exc:
+        raise ImportError("Reading or writing .zst files needs zstandard: pip install zstandard") from exc
+    return zstandard
+
+
+def open_input(path):
+    """ ``path`` opened for binary reading, decompressed on the fly if needed """
+    kind = compression_of(path)
+    if kind is None:
+        return open(path, "rb", buffering=READ_BUFFER)
+    if kind == ".gz":
+        raw = gzip.open(path, "rb")
+    elif kind == ".bz2":
+        raw = bz2.open(path, "rb")
+    elif kind == ".xz":
+        raw = lzma.open(path, "rb")
+    else:
+        raw = _zstandard().ZstdDecompressor().stream_reader(open(path, "rb"), read_size=READ_BUFFER,
+                                                             closefd=True)
+    return io.BufferedReader(raw, READ_BUFFER)
+
+
+def open_output(path, level=None):
+    """ ``path`` opened for binary writing, compressed at ``level`` if its suffix asks for it """
+    kind = compression_of(path)
+    if kind is None:
+        return open(path, "wb", buffering=WRITE_BUFFER)
+    if level is None:
+        level = int(os.environ.get("CIM_COMPRESS_LEVEL") or DEFAULT_LEVELS[kind])
+    if kind == ".gz":
+        raw = gzip.open(path, "wb", compresslevel=level)
+    elif kind == ".bz2":
+        raw = bz2.open(path, "wb", compresslevel=level)
+    elif kind == ".xz":
+        raw = lzma.open(path, "wb", preset=level)
+    else:
+        raw = _zstandard().ZstdCompressor(level=level).stream_writer(open(path, "wb"), closefd=True)
+    return io.BufferedWriter(raw, WRITE_BUFFER)
+
+
+class SpanReader:
+    """
+    Byte ranges of a model file: slices of an mmap for a plain file, a
+    forward pass through the decompressor for a compressed one (cheapest
+    when the ranges are asked for in file order).
+
+        with SpanReader(path) as reader:
+            data = reader.read(start, end)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.compressed = is_compressed(path)
+        self._file = None
+        self._mm = None
+        self._pos = 0
+
+    def __enter__(self):
+        if self.compressed:
+            self._file = open_input(self.path)
+        else:
+            self._file = open(self.path, "rb")
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self
+
+    def __exit__(self, *exc):
+        if self._mm is not None:
+            self._mm.close()
+        self._file.close()
+
+    def read(self, start, end):
+        if self._mm is not None:
+            return self._mm[start:end]
+        if start < self._pos:  # a stream cannot go back: start over
+            self._file.close()
+            self._file = open_input(self.path)
+            self._pos = 0
+        while self._pos < start:
+            skipped = len(self._file.read(min(start - self._pos, READ_BUFFER)))
+            if not skipped:
+                raise ValueError(f"{self.path} ends before byte {start}")
+            self._pos += skipped
+        data = self._file.read(end - start)
+        self._pos += len(data)
+        return data
@@ -0,0 +1,150 @@
+"""Differences between two versions of the NMMS model, as incremental files.
+
+Both models are read through their on-disk indexes (built once each, see
+``index``), which hold every element's rdf:ID and a hash of its bytes; the
+two indexes are joined on rdf:ID inside SQLite, so neither model is ever
+loaded whole.  Elements whose bytes differ are parsed from both files and
+compared once more on a canonical hash (class, literals and references, in
+any order, whatever the formatting), so a re-serialized but unchanged element
+does not count as modified.
+
+``write_diff`` writes the added and modified elements of the new model, plus
+the reference closure they need (``closure.reference_closure``, as in
+``modole_reduction.py``), to an incremental file, and the deleted elements of
+the old model to a second file::
+
+    python -m cim_common.diff NMMS_Model_CIM_Mar_ML1_1_03112025.xml NMMS_Model_CIM_Apr_ML1_1_04082025.xml \\
+        --out incremental_mar_apr.xml --deleted deleted_mar_apr.xml
+"""
+import argparse
+import hashlib
+from contextlib import ExitStack, closing
+
+from cim_common.closure import reference_closure
+from cim_common.compression import SpanReader
+from cim_common.index import open_index
+from cim_common.instrument import metrics
+from cim_common.parallel import root_tags
+from cim_common.update import ModelDiff, _parse_spans
+from cim_common.writer import RdfWriter
+
+
+def canonical_digest(rec, nsmap):
+    """ Hash of what an element says, independent of property order and formatting """
+    prefix, _, local = rec.cls.partition(":")
+    cls = f"{{{nsmap.get(prefix, prefix)}}}{local}" if local else rec.cls
+    digest = hashlib.blake2b(digest_size=16)
+    for part in [rec.rdf_id, cls] + sorted(f"{p}={v}" for p, v in rec.literals) + \
+            sorted(f"{p}->{v}" for p, v in rec.refs):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.digest()
+
+
+CANDIDATES = ("SELECT n.rdf_id, {0}.start, {0}.end FROM main.elements n JOIN old.elements o "
+              "ON o.rdf_id = n.rdf_id WHERE o.digest != n.digest ORDER BY {0}.idx")
+
+
+def _canonical_digests(conn, index, alias):
+    """ {rdf:ID: canonical digest} of the candidates, read in ``index``'s file order """
+    header, footer = root_tags(index.model_path)
+    with closing(conn.execute(CANDIDATES.format(alias))) as spans, SpanReader(index.model_path) as reader:
+        return {rid: canonical_digest(rec, index.nsmap)
+                for rid, rec in _parse_spans(reader, header, footer, spans, None)}
+
+
+def _canonical_changes(conn, old_index, new_index):
+    """
+    (rdf:IDs that really changed, elements compared) among the elements in
+    both models whose bytes differ; each file is read once, front to back.
+    """
+    old_digests = _canonical_digests(conn, old_index, "o")
+    new_digests = _canonical_digests(conn, new_index, "n")
+    changed = {rid for rid, digest in new_digests.items() if old_digests[rid] != digest}
+    return changed, len(new_digests)
+
+
+def diff_models(old_index, new_index):
+    """
+    ModelDiff of two ModelIndexes: added, removed and modified rdf:IDs, and
+    the reference targets of all of them in either model.
+    """
+    conn = new_index.conn
+    conn.execute("ATTACH DATABASE ? AS old", (old_index.index_path,))
+    try:
+        with metrics.phase("diff_ids") as phase:
+            added = {row[0] for row in conn.execute(
+                "SELECT rdf_id FROM main.elements n WHERE NOT EXISTS "
+                "(SELECT 1 FROM old.elements o WHERE o.rdf_id = n.rdf_id)")}
+            removed = {row[0] for row in conn.execute(
+                "SELECT rdf_id FROM old.elements o WHERE NOT EXISTS "
+                "(SELECT 1 FROM main.elements n WHERE n.rdf_id = o.rdf_id)")}
+            phase.fields.update(added=len(added), removed=len(removed))
+
+        # bytes differ: compare what the elements say, not how they are written
+        with metrics.phase("diff_canonical") as phase:
+            changed, compared = _canonical_changes(conn, old_index, new_index)
+            phase.fields.update(compared=compared, modified=len(changed))
+
+        touched = set()
+        for schema, ids in (("old", removed | changed), ("main", added | changed)):
+            conn.execute("CREATE TEMP TABLE diff_ids (rdf_id TEXT PRIMARY KEY)")
+            conn.executemany("INSERT INTO diff_ids VALUES (?)", ((rid,) for rid in ids))
+            touched.update(row[0] for row in conn.execute(
+                f"SELECT r.dst FROM {schema}.refs r JOIN {schema}.elements e ON e.idx = r.src "
+                "JOIN diff_ids d ON d.rdf_id = e.rdf_id"))
+            conn.execute("DROP TABLE diff_ids")
+    finally:
+        conn.commit()  # the temp table inserts opened a transaction
+        conn.execute("DETACH DATABASE old")
+    return ModelDiff(added, removed, changed, touched)
+
+
+def write_diff(old_model, new_model, output_file, deleted_file=None, closure=True, verbose=True):
+    """
+    Write the incremental file (added + modified elements of ``new_model``
+    and, with ``closure``, everything they reference) and, if given, the
+    deleted-elements file; returns (ModelDiff, injected IDs, unresolved IDs).
+    """
+    with ExitStack() as stack:
+        with metrics.phase("open_index"):
+            old_index = stack.enter_context(open_index(old_model))
+            new_index = stack.enter_context(open_index(new_model))
+        diff = diff_models(old_index, new_index)
+        written = diff.added | diff.changed
+
+        injected, not_found = set(), set()
+        if closure and written:
+            with metrics.phase("reference_closure"):
+                missing = {ref for refs in map(new_index.refs, written) for _, ref in refs} - written
+                injected, not_found = reference_closure(new_index, written, missing, verbose)
+
+        with metrics.phase("serialize"):
+            writer = RdfWriter(output_file, new_index.nsmap)
+            with writer:
+                writer.copy_spans(new_model, new_index.spans(written | injected))
+            if deleted_file:
+                writer = RdfWriter(deleted_file, old_index.nsmap)
+                with writer:
+                    writer.copy_spans(old_model, old_index.spans(diff.removed))
+    return diff, injected, not_found
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write the incremental files between two CIM models.")
+    parser.add_argument("old_model", help="previous NMMS CIM XML file")
+    parser.add_argument("new_model", help="new NMMS CIM XML file")
+    parser.add_argument("--out", default="incremental.xml", help="added + modified elements and their closure")
+    parser.add_argument("--deleted", help="also write the deleted elements (from the old model) here")
+    parser.add_argument("--no-closure", action="store_true", help="write only the changed elements themselves")
+    args = parser.parse_args()
+
+    diff, injected, not_found = write_diff(args.old_model, args.new_model, args.out, args.deleted,
+                                           closure=not args.no_closure)
+    print(f"\n📦 {len(diff.added)} added, {len(diff.changed)} modified, {len(diff.removed)} deleted")
+    print(f"🔗 Injected by the reference closure: {len(injected)}")
+    if not_found:
+        print(f"❌ Unresolved references: {len(not_found)}")
+    print(f"💾 Incremental XML written to: {args.out}")
+    if args.deleted:
+        print(f"💾 Deleted elements written to: {args.deleted}")
@@ -0,0 +1,211 @@
+"""Compact integer-ID graph of a CIM model and the multi-source boundary BFS.
+
+Every rdf:ID is interned to an int (the element's position in the model
+index; referenced-but-undefined IDs are appended after the defined ones) and
+the forward and reverse ``rdf:resource`` edges are merged into one CSR
+adjacency (``indptr``/``indices`` NumPy arrays).
+
+``label_origins`` is the label-propagation form of the boundary BFS in
+``bfs_traverse_and_break_at_boundary.py``: each node is either unreached,
+owned by exactly one origin substation, or a boundary node reached by two or
+more.  Only single-origin nodes keep propagating; boundary nodes carry a
+small set of their origins on the side.
+"""
+import numpy as np
+
+from cim_common.instrument import metrics
+
+NO_ORIGIN = -1
+BOUNDARY = -2
+
+
+class CsrGraph:
+    """ Undirected reference graph over interned integer IDs """
+
+    def __init__(self, ids, n_defined, indptr, indices):
+        self.ids = ids                  # store.IdTable: int <-> rdf:ID
+        self.n_defined = n_defined      # ints below this are elements of the model
+        self.indptr = indptr
+        self.indices = indices
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def defined(self):
+        mask = np.zeros(len(self.ids), dtype=bool)
+        mask[:self.n_defined] = True
+        return mask
+
+    def nodes(self, rdf_ids):
+        """ Int of each of ``rdf_ids`` (-1 where unknown) """
+        return self.ids.lookup(rdf_ids)
+
+    def to_ids(self, nodes):
+        return self.ids.to_ids(nodes)
+
+
+def csr_from_edges(n, src, dst):
+    """ Merge forward edges ``src -> dst`` and their reverses into CSR arrays """
+    u = np.concatenate([src, dst])
+    v = np.concatenate([dst, src])
+    order = np.argsort(u, kind="stable")
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(u, minlength=n), out=indptr[1:])
+    return indptr, v[order]
+
+
+def strongly_connected(n, indptr, indices):
+    """
+    Component of each of ``n`` nodes of the directed CSR graph, by Tarjan's
+    algorithm.  Components are numbered in the order they close: every edge
+    between components points to a lower number, and the components closed
+    during one DFS subtree are numbered contiguously.
+    """
+    indptr = indptr.tolist()
+    indices = indices.tolist()
+    index = [-1] * n
+    low = [0] * n
+    comp = [-1] * n
+    stack = []
+    counter = 0
+    n_comp = 0
+    for root in range(n):
+        if index[root] >= 0:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        work = [(root, indptr[root])]
+        while work:
+            v, i = work[-1]
+            end = indptr[v + 1]
+            while i < end:
+                w = indices[i]
+                i += 1
+                if index[w] < 0:  # descend into w, resume v at i later
+                    work[-1] = (v, i)
+                    index[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    work.append((w, indptr[w]))
+                    break
+                if comp[w] < 0 and index[w] < low[v]:  # w is still on the stack
+                    low[v] = index[w]
+            else:
+                work.pop()
+                if low[v] == index[v]:
+                    while True:
+                        w = stack.pop()
+                        comp[w] = n_comp
+                        if w == v:
+                            break
+                    n_comp += 1
+                if work:
+                    u = work[-1][0]
+                    if low[v] < low[u]:
+                        low[u] = low[v]
+    return np.array(comp, dtype=np.int64)
+
+
+def build_graph(model):
+    """ The CSR graph of a ModelIndex or CompactModel (no XML parse) """
+    if not hasattr(model, "graph"):
+        from cim_common.store import CompactModel  # store builds on this module
+        model = CompactModel.from_index(model)
+    return model.graph()
+
+
+def _expand(graph, frontier):
+    """ All (frontier position, neighbor) pairs of ``frontier`` as flat arrays """
+    starts = graph.indptr[frontier]
+    counts = graph.indptr[frontier + 1] - starts
+    total = int(counts.sum())
+    pos = np.repeat(np.arange(len(frontier)), counts)
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    return pos, graph.indices[starts[pos] + offsets]
+
+
+def label_origins(graph, sources):
+    """
+    Multi-source BFS from ``sources`` (node ints), level by level.
+
+    Returns ``(label, boundary)``: ``label[node]`` is the index into
+    ``sources`` of the node's only origin, NO_ORIGIN or BOUNDARY, and
+    ``boundary`` maps each boundary node to the set of its origin indexes.
+    """
+    label, boundary, frontier, n_sources = init_labels(graph, sources)
+    propagate(graph, label, boundary, frontier, n_sources)
+    return label, boundary
+
+
+def init_labels(graph, sources):
+    """ Level-0 state of ``label_origins``: (label, boundary, frontier, n_sources) """
+    sources = np.asarray(sources, dtype=np.int64)
+    label = np.full(len(graph), NO_ORIGIN, dtype=np.int64)
+    label[sources] = np.arange(len(sources))
+    return label, {}, sources[graph.defined[sources]], max(len(sources), 1)
+
+
+def propagate(graph, label, boundary, frontier, n_sources, levels=None, level=0, owner=None):
+    """
+    Run label propagation from ``frontier`` in place, for at most ``levels``
+    levels (all by default); returns the frontier left over.  ``owner``, if
+    given, records the origin each node propagated with.
+    """
+    stop = None if levels is None else level + levels
+    while frontier.size and level != stop:
+        with metrics.phase("label_level", level=level, frontier=int(frontier.size)):
+            frontier, _ = _label_level(graph, label, boundary, frontier, n_sources, owner)
+        level += 1
+    return frontier
+
+
+def _label_level(graph, label, boundary, frontier, n_sources, owner=None):
+    """
+    Propagate origins one BFS level out of ``frontier``; returns the next
+    frontier and the nodes whose label or boundary set may have changed.
+    """
+    if owner is not None:
+        owner[frontier] = label[frontier]
+    pos, nbr = _expand(graph, frontier)
+    metrics.count("elements_visited", len(frontier))
+    metrics.count("references_followed", len(nbr))
+    org = label[frontier][pos]
+    cur = label[nbr]
+    keep = cur != org
+    # one candidate per (neighbor, origin), grouped by neighbor
+    _, first = np.unique(nbr[keep] * n_sources + org[keep], return_index=True)
+    nbr, org, cur = nbr[keep][first], org[keep][first], cur[keep][first]
+
+    # already on a boundary, or single-origin reached by a new origin
+    for node, origin in zip(nbr[cur != NO_ORIGIN].tolist(), org[cur != NO_ORIGIN].tolist()):
+        if label[node] >= 0:
+            boundary[node] = {int(label[node])}
+            label[node] = BOUNDARY
+        boundary[node].add(origin)
+
+    # unreached: one distinct origin owns it, several make it a boundary
+    fresh = cur == NO_ORIGIN
+    nodes, starts, counts = np.unique(nbr[fresh], return_index=True, return_counts=True)
+    fresh_org = org[fresh]
+    single = counts == 1
+    label[nodes[single]] = fresh_org[starts[single]]
+    for node, start, count in zip(nodes[~single].tolist(), starts[~single].tolist(),
+                                  counts[~single].tolist()):
+        label[node] = BOUNDARY
+        boundary[node] = set(fresh_org[start:start + count].tolist())
+
+    frontier = nodes[single]
+    return frontier[graph.defined[frontier]], nbr
+
+
+def select_region(label, boundary, origin_mask):
+    """
+    Nodes owned only by origins in ``origin_mask`` (bool per source index) plus
+    the boundary nodes touching any of them.
+    """
+    owned = np.flatnonzero((label >= 0) & origin_mask[np.maximum(label, 0)])
+    wanted = set(np.flatnonzero(origin_mask).tolist())
+    edge = [node for node, origins in boundary.items() if not origins.isdisjoint(wanted)]
+    return np.concatenate([owned, np.asarray(edge, dtype=np.int64)])
@@ -0,0 +1,99 @@
+"""Incremental element sets for a list of substations.
+
+The extraction behind ``generated_incremental.py``: starting from the named
+substations, collect their voltage levels, AC line segments, the equipment
+that references them, the terminals of all of those and the disconnectors on
+those terminals.  One bucketed scan of the model index feeds every phase.
+"""
+
+INCREMENTAL_CLASSES = ["cim:Substation", "cim:VoltageLevel", "cim:ACLineSegment",
+                       "cim:Terminal", "cim:Disconnector"]
+
+ref_not_include = {
+    "Substation.Region"
+}
+
+
+def referencing(bucket, targets):
+    """ IDs in ``bucket`` with at least one reference into ``targets`` """
+    return {rdf_id for rdf_id, (_, refs) in bucket.items()
+            if any(ref_id in targets for _, ref_id in refs)}
+
+
+def scan_buckets(model_index):
+    """ One scan over the index, bucketed by class with references pre-extracted """
+    return model_index.scan_classes(INCREMENTAL_CLASSES)
+
+
+def incremental_sets(model_index, substation_names, buckets=None, verbose=True):
+    """
+    The incremental element IDs for ``substation_names``, per phase:
+    {"substation", "voltagelevel", "ACLineSegment", "equipment", "Terminal",
+    "Disconnector"} -> set of rdf:IDs.  ``buckets`` (from ``scan_buckets``)
+    can be shared between calls on the same index.
+    """
+    if buckets is None:
+        buckets = scan_buckets(model_index)
+    substation_names = set(substation_names)
+
+    # --- Extract matching Substations ---
+    substations = {}
+    for rdf_id, (name, sub_refs) in buckets["cim:Substation"].items():
+        refs = [ref_id for tag, ref_id in sub_refs if tag not in ref_not_include]
+        if name:
+            substations[name] = (rdf_id, refs)
+
+    if verbose:
+        print(f"Total substations: {len(substations)}")
+        print(f"Missing substations: {substation_names - set(substations)}")
+
+    # --- Collect matched Substation IDs ---
+    substation_ids = set()
+    substation_refs = set()
+    for name in substation_names:
+        if name in substations:
+            rdf_id, refs = substations[name]
+            substation_ids.add(rdf_id)
+            substation_refs.update(refs)
+    if verbose:
+        print("total references in the substation:", len(substation_refs))
+
+    # --- Find VoltageLevels that reference these substations ---
+    voltagelevel_ids = referencing(buckets["cim:VoltageLevel"], substation_ids | substation_refs)
+    if verbose:
+        print("length of incremental_voltagelevel_els:", len(voltagelevel_ids))
+
+    # trying to add all the missing ACLinesegments
+    ACLineSegment_ids = referencing(buckets["cim:ACLineSegment"], substation_ids | substation_refs)
+    if verbose:
+        print("length of incremental_ACLineSegment_els:", len(ACLineSegment_ids))
+
+    # this can find all elements who referenced substation's references
+    # (any class, so it is answered from the index's reverse references)
+    equipment_ids = (model_index.existing(substation_refs)
+                     | model_index.referrers_of(substation_ids | voltagelevel_ids))
+
+    # get all the terminals that ACLiensegments link to
+    Terminal_ids = referencing(buckets["cim:Terminal"],
+                               substation_ids | ACLineSegment_ids | equipment_ids)
+    if verbose:
+        print("length of incremental_Terminal_els:", len(Terminal_ids))
+
+    # get all the disconnectors on those terminals
+    Disconnector_ids = referencing(buckets["cim:Disconnector"], Terminal_ids)
+    if verbose:
+        print("length of incremental_Disconnector_els:", len(Disconnector_ids))
+
+    return {
+        "substation": substation_ids,
+        "voltagelevel": voltagelevel_ids,
+        "ACLineSegment": ACLineSegment_ids,
+        "equipment": equipment_ids,
+        "Terminal": Terminal_ids,
+        "Disconnector": Disconnector_ids,
+    }
+
+
+def all_ids(sets):
+    """ Union of the per-phase sets returned by ``incremental_sets`` """
+    return set().union(*sets.values())
@@ -0,0 +1,258 @@
+"""Persistent on-disk index of a CIM model.
+
+The index is an SQLite file stored next to the model
+(``<model>.index.sqlite``) holding rdf:ID -> class, name, byte span and
+content digest in the model file and the forward references of every
+top-level element; reverse references are answered from an index on the
+reference targets.  It is built once with the streaming loader (in parallel
+chunks on large models, see ``parallel``) and keyed by the model file's size
+and mtime (optionally its SHA-256), so repeated runs against the same monthly
+model open it in seconds instead of reparsing the XML.  A new monthly model
+can be indexed from the previous month's index (see ``update``).
+
+Build it ahead of time with::
+
+    python -m cim_common.index C:/path/to/NMMS_Model_CIM_....xml
+"""
+import argparse
+import hashlib
+import os
+import sqlite3
+from itertools import groupby
+
+from cim_common.compression import SpanReader
+from cim_common.instrument import metrics
+from cim_common.parallel import records_with_spans
+
+INDEX_VERSION = "3"
+BATCH_SIZE = 10000
+SQL_PARAM_LIMIT = 900  # stay below SQLITE_MAX_VARIABLE_NUMBER on old builds
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE nsmap (prefix TEXT, uri TEXT);
+CREATE TABLE elements (idx INTEGER PRIMARY KEY, rdf_id TEXT NOT NULL, cls TEXT, name TEXT,
+                       start INTEGER, end INTEGER, digest INTEGER);
+CREATE TABLE refs (src INTEGER NOT NULL, predicate TEXT, dst TEXT NOT NULL);
+"""
+
+INDEXES = """
+CREATE UNIQUE INDEX elements_rdf_id ON elements (rdf_id);
+CREATE INDEX elements_cls ON elements (cls);
+CREATE INDEX refs_src ON refs (src);
+CREATE INDEX refs_dst ON refs (dst);
+"""
+
+
+def index_path_for(model_path):
+    return f"{model_path}.index.sqlite"
+
+
+def element_digest(data):
+    """ 64-bit content hash of an element's bytes, as a signed SQLite integer """
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little", signed=True)
+
+
+def model_fingerprint(model_path, use_hash=False):
+    """ Size + mtime of the model file, plus its SHA-256 when ``use_hash`` """
+    st = os.stat(model_path)
+    fingerprint = f"{st.st_size}:{st.st_mtime_ns}"
+    if use_hash:
+        digest = hashlib.sha256()
+        with open(model_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        fingerprint += f":{digest.hexdigest()}"
+    return fingerprint
+
+
+def _chunks(seq, size):
+    seq = list(seq)
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
+
+
+def build_index(model_path, index_path=None, use_hash=False, workers=None):
+    """
+    Stream ``model_path`` once and write its index; returns the index path.
+    The parse is spread over ``workers`` processes (see ``parallel``).
+    """
+    index_path = index_path or index_path_for(model_path)
+    tmp_path = index_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    with metrics.phase("index_build", model=model_path):
+        conn = sqlite3.connect(tmp_path)
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.executescript(SCHEMA)
+
+        nsmap = {}
+        element_rows = []
+        ref_rows = []
+        idx = 0
+        with SpanReader(model_path) as reader:
+            for rec, start, end in records_with_spans(model_path, nsmap, workers):
+                element_rows.append((idx, rec.rdf_id, rec.cls, rec.name, start, end,
+                                     element_digest(reader.read(start, end))))
+                ref_rows.extend((idx, pred, dst) for pred, dst in rec.refs)
+                idx += 1
+                if len(element_rows) >= BATCH_SIZE:
+                    conn.executemany("INSERT INTO elements VALUES (?, ?, ?, ?, ?, ?, ?)", element_rows)
+                    conn.executemany("INSERT INTO refs VALUES (?, ?, ?)", ref_rows)
+                    metrics.count("references_indexed", len(ref_rows))
+                    element_rows.clear()
+                    ref_rows.clear()
+        conn.executemany("INSERT INTO elements VALUES (?, ?, ?, ?, ?, ?, ?)", element_rows)
+        conn.executemany("INSERT INTO refs VALUES (?, ?, ?)", ref_rows)
+        conn.executemany("INSERT INTO nsmap VALUES (?, ?)", nsmap.items())
+        metrics.count("references_indexed", len(ref_rows))
+        metrics.count("elements_indexed", idx)
+
+        conn.executescript(INDEXES)
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ("version", INDEX_VERSION),
+            ("model_path", os.path.abspath(model_path)),
+            ("fingerprint", model_fingerprint(model_path, use_hash)),
+        ])
+        conn.commit()
+        conn.close()
+    os.replace(tmp_path, index_path)
+    return index_path
+
+
+def _index_is_current(index_path, model_path, use_hash):
+    if not os.path.exists(index_path):
+        return False
+    conn = sqlite3.connect(index_path)
+    try:
+        meta = dict(conn.execute("SELECT key, value FROM meta"))
+    except sqlite3.DatabaseError:
+        return False
+    finally:
+        conn.close()
+    return (meta.get("version") == INDEX_VERSION
+            and meta.get("fingerprint") == model_fingerprint(model_path, use_hash))
+
+
+def open_index(model_path, index_path=None, use_hash=False, rebuild=False, workers=None):
+    """ Open the index of ``model_path``, (re)building it first if it is stale """
+    index_path = index_path or index_path_for(model_path)
+    if rebuild or not _index_is_current(index_path, model_path, use_hash):
+        print(f"🔨 Building index for {model_path} ...")
+        build_index(model_path, index_path, use_hash, workers)
+    return ModelIndex(index_path, model_path)
+
+
+class ModelIndex:
+    """ Read-only view of a model index """
+
+    def __init__(self, index_path, model_path=None):
+        self.index_path = index_path
+        self.model_path = model_path
+        self.conn = sqlite3.connect(index_path, check_same_thread=False)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM elements").fetchone()[0]
+
+    def __contains__(self, rdf_id):
+        return self._idx(rdf_id) is not None
+
+    @property
+    def nsmap(self):
+        return dict(self.conn.execute("SELECT prefix, uri FROM nsmap"))
+
+    def _idx(self, rdf_id):
+        row = self.conn.execute("SELECT idx FROM elements WHERE rdf_id = ?", (rdf_id,)).fetchone()
+        return row[0] if row else None
+
+    def cls(self, rdf_id):
+        row = self.conn.execute("SELECT cls FROM elements WHERE rdf_id = ?", (rdf_id,)).fetchone()
+        return row[0] if row else None
+
+    def name(self, rdf_id):
+        row = self.conn.execute("SELECT name FROM elements WHERE rdf_id = ?", (rdf_id,)).fetchone()
+        return row[0] if row else None
+
+    def refs(self, rdf_id):
+        """ [(predicate, target ID)] of ``rdf_id``, or None if it is not in the model """
+        idx = self._idx(rdf_id)
+        if idx is None:
+            return None
+        return self.conn.execute(
+            "SELECT predicate, dst FROM refs WHERE src = ? ORDER BY rowid", (idx,)).fetchall()
+
+    def referrers_of(self, rdf_ids):
+        """ rdf:IDs of the elements that reference any of ``rdf_ids`` """
+        found = set()
+        for chunk in _chunks(rdf_ids, SQL_PARAM_LIMIT):
+            marks = ",".join("?" * len(chunk))
+            found.update(row[0] for row in self.conn.execute(
+                f"SELECT e.rdf_id FROM refs r JOIN elements e ON e.idx = r.src WHERE r.dst IN ({marks})",
+                chunk))
+        return found
+
+    def ids_of_class(self, cls):
+        return [row[0] for row in self.conn.execute(
+            "SELECT rdf_id FROM elements WHERE cls = ? ORDER BY idx", (cls,))]
+
+    def scan_classes(self, classes):
+        """
+        One pass over the elements of ``classes``, bucketed by class:
+        {cls: {rdf_id: (name, refs)}} with each bucket in document order.
+        """
+        classes = list(classes)
+        buckets = {cls: {} for cls in classes}
+        marks = ",".join("?" * len(classes))
+        rows = self.conn.execute(
+            "SELECT e.idx, e.rdf_id, e.cls, e.name, r.predicate, r.dst FROM elements e "
+            f"LEFT JOIN refs r ON r.src = e.idx WHERE e.cls IN ({marks}) ORDER BY e.idx, r.rowid",
+            classes)
+        for (_, rdf_id, cls, name), group in groupby(rows, key=lambda row: row[:4]):
+            buckets[cls][rdf_id] = (name, [(pred, dst) for *_, pred, dst in group if dst is not None])
+        return buckets
+
+    def spans(self, rdf_ids):
+        """ Sorted (start, end) byte ranges in the model file of the defined ``rdf_ids`` """
+        found = []
+        for chunk in _chunks(rdf_ids, SQL_PARAM_LIMIT):
+            marks = ",".join("?" * len(chunk))
+            found.extend(self.conn.execute(
+                f"SELECT start, end FROM elements WHERE rdf_id IN ({marks})", chunk))
+        found.sort()
+        return found
+
+    def existing(self, rdf_ids):
+        """ The subset of ``rdf_ids`` defined in the model """
+        found = set()
+        for chunk in _chunks(rdf_ids, SQL_PARAM_LIMIT):
+            marks = ",".join("?" * len(chunk))
+            found.update(row[0] for row in self.conn.execute(
+                f"SELECT rdf_id FROM elements WHERE rdf_id IN ({marks})", chunk))
+        return found
+
+    def load_model(self):
+        """ Bulk-load the whole index into an in-memory, array-backed CompactModel """
+        from cim_common.store import CompactModel  # store builds on this module
+        return CompactModel.from_index(self)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the persistent ID/reference index of a CIM model.")
+    parser.add_argument("model", help="NMMS CIM XML file")
+    parser.add_argument("--index", help="index file (default: <model>.index.sqlite)")
+    parser.add_argument("--hash", action="store_true", help="key the index on the file's SHA-256 as well")
+    parser.add_argument("--workers", type=int, help="parser processes (default: CIM_WORKERS or all cores)")
+    args = parser.parse_args()
+    path = build_index(args.model, args.index, args.hash, args.workers)
+    print(f"✅ Index written to {path}")
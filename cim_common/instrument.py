@@ -0,0 +1,185 @@
+"""Phase timing, memory and counter instrumentation for the CIM scripts.
+
+Every script phase (delete-file read, index build, each BFS level, labeling,
+serialize, ...) runs inside ``metrics.phase(name)``, which records its wall
+time, CPU time, peak RSS and the counters (elements visited, references
+followed, not-found IDs, ...) that moved while it ran.  Records are written as
+JSON lines, so a slow monthly run can be taken apart afterwards without
+rerunning it under a profiler.
+
+Nothing is recorded unless it is switched on, either from the environment::
+
+    CIM_METRICS=run.jsonl      JSON lines to this file ("-" for stderr)
+    CIM_PROFILE=run.prof       also run the whole script under cProfile
+    CIM_TRACEMALLOC=1          also record Python allocation peaks per phase
+
+or with ``configure(...)`` before the first phase.
+"""
+import atexit
+import cProfile
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_PROC_STATUS = "/proc/self/status"
+_PROC_CLEAR_REFS = "/proc/self/clear_refs"
+
+
+def peak_rss_mb():
+    """ Peak resident set size of this process so far (MB), or None if unknown """
+    try:
+        with open(_PROC_STATUS) as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KiB elsewhere
+
+
+def _reset_peak_rss():
+    """ Restart the peak RSS high-water mark where the OS allows it (Linux) """
+    try:
+        with open(_PROC_CLEAR_REFS, "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+class Phase:
+    """ One running phase; ``fields`` end up in its JSON record """
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+        self.child_peak = None  # peak RSS seen before resets by nested phases
+
+
+class Metrics:
+    def __init__(self, path=None, profile=None, trace_memory=False):
+        self.enabled = False
+        self.counters = Counter()
+        self._out = None
+        self._stack = []
+        self._run = Phase("run", {})
+        self._profiler = None
+        self._profile_path = None
+        self._trace_memory = False
+        self._started = (time.perf_counter(), time.process_time())
+        if path or profile or trace_memory:
+            self.configure(path, profile, trace_memory)
+
+    def configure(self, path=None, profile=None, trace_memory=False):
+        """ Start recording phases to ``path`` (JSON lines, "-" for stderr) """
+        if path:
+            self._out = sys.stderr if path == "-" else open(path, "a", encoding="utf-8")
+        if profile:
+            self._profile_path = profile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        if trace_memory:
+            self._trace_memory = True
+            tracemalloc.start()
+        if not self.enabled:
+            self.enabled = True
+            self._started = (time.perf_counter(), time.process_time())
+            atexit.register(self.close)
+
+    def count(self, name, n=1):
+        """ Add ``n`` to the counter ``name`` """
+        self.counters[name] += n
+
+    def emit(self, record):
+        if self._out is not None:
+            self._out.write(json.dumps(record) + "\n")
+            self._out.flush()
+
+    @contextmanager
+    def phase(self, name, **fields):
+        """
+        Time the enclosed block as phase ``name``; ``fields`` (and anything
+        added to the yielded phase's ``fields``) go into its record.
+        """
+        current = Phase(name, fields)
+        if not self.enabled:
+            yield current
+            return
+        before = Counter(self.counters)
+        if self._stack:  # keep the enclosing phase's peak so far before resetting it
+            self._merge_peak(self._stack[-1], peak_rss_mb())
+        rss_reset = _reset_peak_rss()
+        if self._trace_memory:
+            tracemalloc.reset_peak()
+        self._stack.append(current)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield current
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            self._stack.pop()
+            peak = peak_rss_mb()
+            if peak is not None and current.child_peak is not None:
+                peak = max(peak, current.child_peak)
+            record = {
+                "event": "phase",
+                "phase": "/".join([p.name for p in self._stack] + [name]),
+                "wall_s": round(wall, 6),
+                "cpu_s": round(cpu, 6),
+                "peak_rss_mb": peak,
+                "peak_rss_scope": "phase" if rss_reset else "process",
+                "counters": dict(self.counters - before),
+            }
+            if self._trace_memory:
+                record["tracemalloc_peak_mb"] = tracemalloc.get_traced_memory()[1] / (1 << 20)
+            record.update(current.fields)
+            self.emit(record)
+            self._merge_peak(self._stack[-1] if self._stack else self._run, peak)
+
+    @staticmethod
+    def _merge_peak(current, peak):
+        if peak is not None:
+            current.child_peak = peak if current.child_peak is None else max(current.child_peak, peak)
+
+    def close(self):
+        """ Write the whole-run record (and the cProfile dump) once """
+        if not self.enabled:
+            return
+        self.enabled = False
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profiler.dump_stats(self._profile_path)
+        self._merge_peak(self._run, peak_rss_mb())
+        self.emit({
+            "event": "run",
+            "script": os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else None,
+            "wall_s": round(time.perf_counter() - self._started[0], 6),
+            "cpu_s": round(time.process_time() - self._started[1], 6),
+            "peak_rss_mb": self._run.child_peak,
+            "counters": dict(self.counters),
+            "profile": self._profile_path,
+        })
+        if self._out is not None and self._out is not sys.stderr:
+            self._out.close()
+        self._out = None
+
+
+metrics = Metrics(os.environ.get("CIM_METRICS"), os.environ.get("CIM_PROFILE"),
+                  os.environ.get("CIM_TRACEMALLOC", "") not in ("", "0"))
+
+
+def configure(path=None, profile=None, trace_memory=False):
+    """ Switch on the shared ``metrics`` from code instead of the environment """
+    metrics.configure(path, profile, trace_memory)
@@ -0,0 +1,231 @@
+"""Referential-integrity check of a CIM file: references to IDs it never defines.
+
+Any CIM file (the model, a delete file, a reduced or incremental output) is
+streamed through the loader and every ``rdf:resource`` target is checked
+against the ``rdf:ID``s the file defines.  Dangling references are reported
+grouped by the class of the referring element and the predicate, with a few
+examples each.  Both modes are exact:
+
+* default: one pass collecting the defined IDs, a second checking every
+  reference target against them.  Memory grows with the elements, not with
+  the references.
+* ``budget``: a Bloom filter of the defined IDs, exactly ``budget`` bytes,
+  as a pre-pass.  A reference the filter rejects is certainly dangling; the
+  targets it accepts are collected (about ``budget`` bytes of them at a
+  time, and never fewer than ``MIN_CANDIDATES``) and confirmed against the
+  real rdf:IDs in another streaming pass, so a false positive never hides a
+  dangling reference.  Each further batch of distinct accepted targets costs
+  one more pass over the file, so a small budget multiplies the passes.
+
+The exit status is 1 when dangling references are found, so generated files
+can be gated on it::
+
+    python -m cim_common.integrity output.xml
+    python -m cim_common.integrity NMMS_Model_CIM_Mar_ML1_1_03112025.xml --budget 64
+"""
+import argparse
+import math
+import sys
+from collections import Counter, defaultdict, namedtuple
+
+import numpy as np
+
+from cim_common.instrument import metrics
+from cim_common.loader import iter_records
+
+BLOOM_HASHES = 7
+BATCH_SIZE = 1 << 16
+CANDIDATE_BYTES = 256  # rough cost of one accepted target awaiting confirmation
+MIN_CANDIDATES = 1 << 16  # ~16 MB: fewer would mean a re-parse per handful of targets
+_MASK32 = np.uint64(0xFFFFFFFF)
+
+# ``dangling`` counts dangling references per (class, predicate), ``missing``
+# is the number of distinct undefined targets and ``examples`` holds up to a
+# few (referring rdf:ID, target) pairs per group.  ``false_positive_rate`` is
+# the share of the Bloom filter's accepted targets that needed confirming in
+# vain (0.0 in the default mode).
+IntegrityReport = namedtuple("IntegrityReport", ["path", "mode", "elements", "references", "dangling",
+                                                 "missing", "examples", "false_positive_rate"])
+
+
+def _hashes(ids):
+    """ 64-bit hashes of ``ids`` (Python's string hash: stable within one process) """
+    return np.array([hash(rid) for rid in ids], dtype=np.int64).view(np.uint64)
+
+
+class BloomFilter:
+    """ Fixed-size Bloom filter over 64-bit hashes (double hashing from the two halves) """
+
+    def __init__(self, n_bytes, n_hashes=BLOOM_HASHES):
+        self.bits = np.zeros(max(int(n_bytes), 1), dtype=np.uint8)
+        self.n_bits = np.uint64(len(self.bits) * 8)
+        self.n_hashes = n_hashes
+        self.count = 0
+
+    def _positions(self, hashes):
+        low, high = hashes & _MASK32, (hashes >> np.uint64(32)) | np.uint64(1)
+        return [(low + np.uint64(i) * high) % self.n_bits for i in range(self.n_hashes)]
+
+    def add(self, hashes):
+        for pos in self._positions(hashes):
+            np.bitwise_or.at(self.bits, (pos >> np.uint64(3)).astype(np.int64),
+                             (np.uint8(1) << (pos & np.uint64(7)).astype(np.uint8)))
+        self.count += len(hashes)
+
+    def might_contain(self, hashes):
+        """ Boolean array: which of ``hashes`` may be in the filter """
+        hit = np.ones(len(hashes), dtype=bool)
+        for pos in self._positions(hashes):
+            byte = self.bits[(pos >> np.uint64(3)).astype(np.int64)]
+            hit &= (byte >> (pos & np.uint64(7)).astype(np.uint8)) & 1 == 1
+        return hit
+
+    def false_positive_rate(self):
+        return (1 - math.exp(-self.n_hashes * self.count / float(self.n_bits))) ** self.n_hashes
+
+
+def _batches(path, size=BATCH_SIZE):
+    """ Lists of up to ``size`` records of ``path`` """
+    batch = []
+    for rec in iter_records(path):
+        batch.append(rec)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class _Dangling:
+    """ Dangling references found so far: counts, distinct targets and examples per group """
+
+    def __init__(self, examples):
+        self.counts = Counter()
+        self.missing = set()
+        self.named = defaultdict(list)
+        self.examples = examples
+
+    def add(self, group, src, dst, n=1):
+        self.counts[group] += n
+        self.missing.add(dst)
+        if len(self.named[group]) < self.examples:
+            self.named[group].append((src, dst))
+
+    def report(self, path, mode, elements, references, rate):
+        return IntegrityReport(path, mode, elements, references, self.counts, len(self.missing),
+                               {key: pairs for key, pairs in self.named.items() if pairs}, rate)
+
+
+def _check_exact(path, examples):
+    with metrics.phase("integrity_defined", mode="exact") as phase:
+        defined = {rec.rdf_id for batch in _batches(path) for rec in batch if rec.rdf_id}
+        phase.fields["elements"] = len(defined)
+
+    found = _Dangling(examples)
+    references = 0
+    with metrics.phase("integrity_refs") as phase:
+        for batch in _batches(path):
+            for rec in batch:
+                for pred, dst in rec.refs:
+                    references += 1
+                    if dst not in defined:
+                        found.add((rec.cls, pred), rec.rdf_id, dst)
+        phase.fields.update(references=references, dangling=sum(found.counts.values()))
+    return found.report(path, "exact", len(defined), references, 0.0)
+
+
+def _confirm(path, candidates, found):
+    """
+    Stream the rdf:IDs of ``path`` once, dropping the ``candidates``
+    ({target: {(class, predicate): [count, referring rdf:ID]}}) it defines;
+    the rest are dangling.  Returns how many candidates were not defined.
+    """
+    with metrics.phase("integrity_confirm", candidates=len(candidates)):
+        for batch in _batches(path):
+            for rec in batch:
+                candidates.pop(rec.rdf_id, None)
+        for dst, groups in candidates.items():
+            for group, (n, src) in groups.items():
+                found.add(group, src, dst, n)
+        missed = len(candidates)
+        candidates.clear()
+    return missed
+
+
+def _check_bloom(path, budget, examples):
+    bloom = BloomFilter(budget)
+    with metrics.phase("integrity_defined", mode="bloom", bytes=len(bloom.bits)) as phase:
+        for batch in _batches(path):
+            bloom.add(_hashes([rec.rdf_id for rec in batch if rec.rdf_id]))
+        phase.fields["elements"] = bloom.count
+
+    found = _Dangling(examples)
+    limit = max(budget // CANDIDATE_BYTES, MIN_CANDIDATES)
+    candidates = {}  # accepted targets awaiting confirmation
+    accepted = false_positives = references = 0
+    with metrics.phase("integrity_refs") as phase:
+        for batch in _batches(path):
+            refs = [(rec, pred, dst) for rec in batch for pred, dst in rec.refs]
+            references += len(refs)
+            hit = bloom.might_contain(_hashes([dst for _, _, dst in refs])) if refs else []
+            for (rec, pred, dst), maybe in zip(refs, hit):
+                if not maybe:
+                    found.add((rec.cls, pred), rec.rdf_id, dst)
+                    continue
+                groups = candidates.get(dst)
+                if groups is None:
+                    groups = candidates[dst] = {}
+                    accepted += 1
+                entry = groups.get((rec.cls, pred))
+                if entry is None:
+                    groups[(rec.cls, pred)] = [1, rec.rdf_id]
+                else:
+                    entry[0] += 1
+            if len(candidates) >= limit:
+                false_positives += _confirm(path, candidates, found)
+        if candidates:
+            false_positives += _confirm(path, candidates, found)
+        phase.fields.update(references=references, accepted=accepted, dangling=sum(found.counts.values()))
+    return found.report(path, "bloom", bloom.count, references, false_positives / accepted if accepted else 0.0)
+
+
+def check_integrity(path, budget=None, examples=5):
+    """
+    IntegrityReport of the references in ``path`` that point at IDs it does
+    not define, holding every defined ID or, with ``budget``, a Bloom filter
+    of that many bytes and at most as many bytes of targets to confirm.
+    """
+    if budget:
+        return _check_bloom(path, budget, examples)
+    return _check_exact(path, examples)
+
+
+def print_report(report):
+    print(f"🔍 {report.path}: {report.elements} elements, {report.references} references ({report.mode})")
+    if report.mode == "bloom":
+        print(f"   Bloom false positives (confirmed dangling): {report.false_positive_rate:.2e}")
+    if not report.dangling:
+        print("✅ No dangling references")
+        return
+    print(f"❌ {sum(report.dangling.values())} dangling references to {report.missing} undefined IDs")
+    for (cls, pred), n in report.dangling.most_common():
+        print(f"   {n:>8}  {cls} / {pred}")
+        for src, dst in report.examples.get((cls, pred), []):
+            print(f"             {src} -> {dst}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report references to IDs a CIM file does not define.")
+    parser.add_argument("files", nargs="+", help="CIM XML files (model, delete file or outputs)")
+    parser.add_argument("--budget", type=float,
+                        help="check within about this many MB (at least ~16): Bloom filter plus confirmation "
+                             "passes; a small budget means more passes over the file")
+    parser.add_argument("--examples", type=int, default=5, help="dangling references shown per group")
+    args = parser.parse_args()
+
+    clean = True
+    for path in args.files:
+        report = check_integrity(path, int(args.budget * (1 << 20)) if args.budget else None, args.examples)
+        print_report(report)
+        clean = clean and not report.dangling
+    sys.exit(0 if clean else 1)
@@ -0,0 +1,226 @@
+"""Persisted substation-origin labels and their local repair.
+
+The boundary labels (``graph.label_origins``) are the expensive part of
+``bfs_traverse_and_break_at_boundary.py``.  ``compute_labels`` runs them the
+way ``components`` does -- a few global warm-up levels, then the rest per
+component of the still active nodes -- and keeps enough of that run to
+repair it later: the warm-up state, the final labels and the origin each
+node propagated with (its owner).  The state is saved next to the model
+(``<model>.labels.npz``) and keyed by the model's fingerprint.
+
+When next month's model arrives, ``repair_labels`` reruns only the warm-up
+on the new graph.  An active component whose nodes and neighbors are
+untouched by the update (same references, same warm-up state) ends exactly
+as it did last month, so its labels and owners are copied over; only the
+components around added, removed or changed elements are propagated again.
+"""
+import os
+
+import numpy as np
+
+from cim_common.components import WARMUP_LEVELS, active_components, run_components, worker_count
+from cim_common.graph import BOUNDARY, NO_ORIGIN, init_labels, propagate
+from cim_common.index import model_fingerprint
+from cim_common.instrument import metrics
+from cim_common.store import IdTable
+
+LABELS_VERSION = "1"
+MISSING_ORIGIN = -3  # an origin of the old state that is no longer a source
+
+
+def labels_path_for(model_path):
+    return f"{model_path}.labels.npz"
+
+
+def _pack_sets(sets):
+    """ {node: set of origins} -> (nodes, indptr, origins) arrays """
+    nodes = np.array(sorted(sets), dtype=np.int64)
+    counts = np.array([len(sets[node]) for node in nodes.tolist()], dtype=np.int64)
+    indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    origins = [origin for node in nodes.tolist() for origin in sorted(sets[node])]
+    return nodes, indptr, np.array(origins, dtype=np.int64)
+
+
+def _unpack_sets(nodes, indptr, origins):
+    origins = origins.tolist()
+    return {node: set(origins[lo:hi])
+            for node, lo, hi in zip(nodes.tolist(), indptr[:-1].tolist(), indptr[1:].tolist())}
+
+
+class LabelState:
+    """ Boundary labels of one model plus what ``repair_labels`` needs to reuse them """
+
+    def __init__(self, ids, source_ids, warmup_levels, warm_label, warm_active, warm_boundary,
+                 label, boundary, owner):
+        self.ids = ids                      # IdTable of the graph the labels belong to
+        self.source_ids = source_ids        # origin index -> substation rdf:ID
+        self.warmup_levels = warmup_levels
+        self.warm_label = warm_label        # label after the warm-up levels
+        self.warm_active = warm_active      # frontier or unreached after the warm-up
+        self.warm_boundary = warm_boundary
+        self.label = label
+        self.boundary = boundary
+        self.owner = owner                  # origin each node propagated with, or NO_ORIGIN
+
+    def save(self, path, model_path):
+        """ Write the state to ``path`` (.npz), keyed by ``model_path``'s fingerprint """
+        tmp_path = path + ".tmp"
+        warm_nodes, warm_indptr, warm_origins = _pack_sets(self.warm_boundary)
+        nodes, indptr, origins = _pack_sets(self.boundary)
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f, version=np.array(LABELS_VERSION), fingerprint=np.array(model_fingerprint(model_path)),
+                keys=self.ids.keys, source_ids=np.array([sid.encode("utf-8") for sid in self.source_ids],
+                                                        dtype=bytes),
+                warmup_levels=np.array(self.warmup_levels), warm_label=self.warm_label,
+                warm_active=self.warm_active, warm_nodes=warm_nodes, warm_indptr=warm_indptr,
+                warm_origins=warm_origins, label=self.label, boundary_nodes=nodes,
+                boundary_indptr=indptr, boundary_origins=origins, owner=self.owner)
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                ids=IdTable(data["keys"]),
+                source_ids=[sid.decode("utf-8") for sid in data["source_ids"].tolist()],
+                warmup_levels=int(data["warmup_levels"]),
+                warm_label=data["warm_label"],
+                warm_active=data["warm_active"],
+                warm_boundary=_unpack_sets(data["warm_nodes"], data["warm_indptr"], data["warm_origins"]),
+                label=data["label"],
+                boundary=_unpack_sets(data["boundary_nodes"], data["boundary_indptr"],
+                                      data["boundary_origins"]),
+                owner=data["owner"],
+            )
+
+
+def load_labels(model_path, path=None):
+    """ The saved LabelState of ``model_path``, or None if there is none or it is stale """
+    path = path or labels_path_for(model_path)
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        if (str(data["version"]) != LABELS_VERSION
+                or str(data["fingerprint"]) != model_fingerprint(model_path)):
+            return None
+    return LabelState.load(path)
+
+
+def _warm_up(graph, source_ids, warmup_levels):
+    sources = graph.nodes(source_ids)
+    label, boundary, frontier, n_sources = init_labels(graph, sources)
+    frontier = propagate(graph, label, boundary, frontier, n_sources, warmup_levels)
+    active = label == NO_ORIGIN
+    active[frontier] = True
+    warm_boundary = {node: set(origins) for node, origins in boundary.items()}
+    return label, boundary, frontier, n_sources, active, warm_boundary
+
+
+def _finish(graph, label, boundary, frontier, n_sources, level, workers, owner):
+    """ Propagate ``frontier`` to the end, per component when there are several workers """
+    if not frontier.size:
+        return
+    if workers > 1:
+        active, comp = active_components(graph, label, frontier)
+        run_components(graph, label, boundary, frontier, active, comp, n_sources, level, workers, owner)
+    else:
+        propagate(graph, label, boundary, frontier, n_sources, level=level, owner=owner)
+
+
+def compute_labels(graph, source_ids, workers=None, warmup_levels=WARMUP_LEVELS):
+    """ ``graph.label_origins`` from the substations ``source_ids``, as a LabelState """
+    workers = worker_count() if workers is None else workers
+    label, boundary, frontier, n_sources, warm_active, warm_boundary = _warm_up(
+        graph, source_ids, warmup_levels)
+    warm_label = label.copy()
+    owner = np.full(len(graph), NO_ORIGIN, dtype=np.int64)
+    _finish(graph, label, boundary, frontier, n_sources, warmup_levels, workers, owner)
+    return LabelState(graph.ids, list(source_ids), warmup_levels, warm_label, warm_active,
+                      warm_boundary, label, boundary, owner)
+
+
+def _absorb(label, boundary, nodes, origins):
+    """ Add each of ``origins`` to the matching labeled node, as a neighbor expanding into it would """
+    differ = label[nodes] != origins
+    for node, origin in zip(nodes[differ].tolist(), origins[differ].tolist()):
+        if label[node] == origin:
+            continue
+        if label[node] >= 0:
+            boundary[node] = {int(label[node])}
+            label[node] = BOUNDARY
+        boundary[node].add(origin)
+
+
+def repair_labels(old, graph, source_ids, changed_ids, workers=None):
+    """
+    The LabelState of ``graph`` (the updated model) from ``old`` (the previous
+    model's state), rerunning only the active components near ``changed_ids``:
+    the added, removed and changed elements and the targets of their old and
+    new references.
+    """
+    workers = worker_count() if workers is None else workers
+    source_ids = list(source_ids)
+    label, boundary, frontier, n_sources, active, warm_boundary = _warm_up(
+        graph, source_ids, old.warmup_levels)
+    warm_label = label.copy()
+    owner = np.full(len(graph), NO_ORIGIN, dtype=np.int64)
+
+    # --- old origin indexes -> new ones, old nodes of the new graph's nodes ---
+    new_origin = {sid: i for i, sid in enumerate(source_ids)}
+    remap = np.array([new_origin.get(sid, MISSING_ORIGIN) for sid in old.source_ids] + [0], dtype=np.int64)
+
+    def renumber(labels):
+        return np.where(labels >= 0, remap[np.maximum(labels, 0)], labels)
+
+    def renumber_set(origins):
+        return {int(remap[origin]) for origin in origins}
+
+    old_node = old.ids.lookup_table(graph.ids)
+
+    # --- dirty: changed by the update, new, or with a different warm-up state ---
+    dirty = old_node < 0
+    nodes = graph.nodes(list(changed_ids))
+    dirty[nodes[nodes >= 0]] = True
+    mapped = np.flatnonzero(~dirty)
+    prev = old_node[mapped]
+    same = (renumber(old.warm_label[prev]) == label[mapped]) & (old.warm_active[prev] == active[mapped])
+    dirty[mapped[~same]] = True
+    for node in mapped[same & (label[mapped] == BOUNDARY)].tolist():
+        if warm_boundary[node] != renumber_set(old.warm_boundary[int(old_node[node])]):
+            dirty[node] = True
+
+    # a component is reused when none of its nodes or their neighbors is dirty
+    _, comp = active_components(graph, label, frontier)
+    src = np.repeat(np.arange(len(graph), dtype=np.int64), np.diff(graph.indptr))
+    near = dirty.copy()
+    near[src[dirty[graph.indices]]] = True
+    redo = np.zeros(len(graph), dtype=bool)
+    redo[comp[active & near]] = True
+    redo = redo[comp] & active
+    keep = active & ~redo
+    metrics.count("components_recomputed", len(np.unique(comp[redo])))
+    metrics.count("components_reused", len(np.unique(comp[keep])))
+
+    with metrics.phase("reuse_labels", nodes=int(keep.sum())):
+        kept = np.flatnonzero(keep)
+        label[kept] = renumber(old.label[old_node[kept]])
+        owner[kept] = renumber(old.owner[old_node[kept]])
+        for node in kept[label[kept] == BOUNDARY].tolist():
+            boundary[node] = renumber_set(old.boundary[int(old_node[node])])
+        # what the reused components propagated into the labeled nodes around them
+        edge = keep[src] & (owner[src] >= 0) & ~active[graph.indices]
+        _absorb(label, boundary, graph.indices[edge], owner[src[edge]])
+    del src
+
+    frontier = frontier[redo[frontier]]
+    if frontier.size:
+        if workers > 1:
+            run_components(graph, label, boundary, frontier, redo, comp, n_sources,
+                           old.warmup_levels, workers, owner)
+        else:
+            propagate(graph, label, boundary, frontier, n_sources, level=old.warmup_levels, owner=owner)
+    return LabelState(graph.ids, source_ids, old.warmup_levels, warm_label, active,
+                      warm_boundary, label, boundary, owner)
@@ -0,0 +1,141 @@
+"""Streaming loader for NMMS CIM RDF/XML models.
+
+The NMMS model is a flat ``rdf:RDF`` document: every CIM object is a direct
+child of the root and its properties are one level below it.  Instead of
+keeping the whole tree resident (``ET.parse``), the loader walks the top-level
+children with ``iterparse``, pulls out what the scripts need and clears each
+element straight away, so memory stays flat however large the model gets.
+"""
+import os
+import xml.etree.ElementTree as ET
+from collections import defaultdict, namedtuple
+from contextlib import nullcontext
+
+from cim_common.compression import open_input
+
+# --- Namespaces ---
+RDF_NS = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+CIM_NS = "http://iec.ch/TC57/2006/CIM-schema-cim10#"
+ETX_NS = "http://www.ercot.com/CIM11R0/2008/2.0/extension#"
+
+RDF_ID = f"{{{RDF_NS}}}ID"
+RDF_RESOURCE = f"{{{RDF_NS}}}resource"
+NAME_TAG = f"{{{CIM_NS}}}IdentifiedObject.name"
+
+# One top-level CIM object.  ``cls`` is the prefixed class ("cim:Substation"),
+# ``literals`` and ``refs`` are lists of (predicate, value) pairs where the
+# predicate is the local property name ("Substation.Region") and a ref value
+# is the target rdf:ID without the leading "#".
+CimRecord = namedtuple("CimRecord", ["rdf_id", "cls", "name", "literals", "refs"])
+
+
+def get_id(val):
+    return val[1:] if val and val.startswith("#") else None
+
+
+def local_name(tag):
+    return tag.split("}", 1)[1] if tag.startswith("{") else tag
+
+
+def prefixed_name(tag, prefixes):
+    """ Turn '{uri}Local' into 'prefix:Local' using the document's prefixes """
+    if not tag.startswith("{"):
+        return tag
+    uri, local = tag[1:].split("}", 1)
+    prefix = prefixes.get(uri)
+    return f"{prefix}:{local}" if prefix else tag
+
+
+def _to_record(el, prefixes):
+    name = None
+    literals = []
+    refs = []
+    for child in el:
+        pred = local_name(child.tag)
+        ref = get_id(child.get(RDF_RESOURCE))
+        if ref:
+            refs.append((pred, ref))
+        elif child.text and child.text.strip():
+            text = child.text.strip()
+            literals.append((pred, text))
+            if child.tag == NAME_TAG:
+                name = text
+    return CimRecord(el.get(RDF_ID), prefixed_name(el.tag, prefixes), name, literals, refs)
+
+
+def opened(source):
+    """ A path (compressed or not) opened for reading, or a file object as it is """
+    return open_input(source) if isinstance(source, (str, os.PathLike)) else nullcontext(source)
+
+
+def iter_records(source, nsmap=None):
+    """
+    Stream the top-level RDF children of ``source`` as CimRecords.
+
+    ``nsmap`` (optional dict) is filled with prefix -> uri for every namespace
+    the document declares.
+    """
+    prefixes = {}
+    depth = 0
+    root = None
+    with opened(source) as f:
+        for event, item in ET.iterparse(f, events=("start-ns", "start", "end")):
+            if event == "start-ns":
+                prefix, uri = item
+                prefixes.setdefault(uri, prefix)
+                if nsmap is not None:
+                    nsmap.setdefault(prefix, uri)
+            elif event == "start":
+                if root is None:
+                    root = item
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 1:
+                    yield _to_record(item, prefixes)
+                    # drop the finished element so the tree never grows
+                    root.clear()
+
+
+class CimModel:
+    """ ID map and reference lists of a CIM model, without the element trees """
+
+    def __init__(self):
+        self.classes = {}                     # rdf:ID -> "cim:Class"
+        self.names = {}                       # rdf:ID -> IdentifiedObject.name
+        self.refs = {}                        # rdf:ID -> [(predicate, target ID)]
+        self.reverse_refs = defaultdict(set)  # target ID -> {referencing rdf:IDs}
+        self.nsmap = {}                       # prefix -> namespace uri
+
+    def __contains__(self, rdf_id):
+        return rdf_id in self.classes
+
+    def __len__(self):
+        return len(self.classes)
+
+    def add(self, rec):
+        if rec.rdf_id:
+            self.classes[rec.rdf_id] = rec.cls
+            self.refs[rec.rdf_id] = rec.refs
+            if rec.name:
+                self.names[rec.rdf_id] = rec.name
+        for _, ref in rec.refs:
+            self.reverse_refs[ref].add(rec.rdf_id)
+
+    def ids_of_class(self, cls):
+        return [rid for rid, c in self.classes.items() if c == cls]
+
+    def neighbors(self, rdf_id):
+        """ Forward and reverse references of ``rdf_id`` """
+        out = [ref for _, ref in self.refs.get(rdf_id, ())]
+        out.extend(self.reverse_refs.get(rdf_id, ()))
+        return out
+
+
+def load_model(source):
+    """ Build a CimModel from ``source`` in a single streaming pass """
+    model = CimModel()
+    for rec in iter_records(source, model.nsmap):
+        model.add(rec)
+    return model
+
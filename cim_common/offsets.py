@@ -0,0 +1,103 @@
+"""Byte offsets of the top-level elements of a CIM RDF/XML file.
+
+``scan_spans`` records where every top-level element starts and ends in the
+source file.  Output files are then assembled by slicing those ranges out of
+an ``mmap`` of the source (or, for a compressed source, one forward pass
+through it) and writing them straight to the output: no parse/serialize
+round trip, and the output follows source order.
+"""
+import re
+import xml.parsers.expat
+
+from cim_common.compression import SpanReader, open_input
+from cim_common.loader import RDF_NS
+
+READ_SIZE = 1 << 20
+
+# <tag attr="..." .../>  ->  <tag attr="..."></tag>, attribute values may hold '>' or '/'
+EMPTY_TAG = re.compile(rb"""<([^\s/>!?]+)((?:\s+[^\s=/>]+\s*=\s*(?:"[^"]*"|'[^']*'))*)\s*/>""")
+
+
+def expand_empty_tags(data):
+    """ Rewrite self-closing tags in ``data`` with explicit close tags """
+    if b"/>" not in data:
+        return data
+    return EMPTY_TAG.sub(rb"<\1\2></\1>", data)
+
+
+def _span_parser(nsmap, pending):
+    """
+    An expat parser that appends (rdf_id, start, close) to ``pending`` for
+    every top-level element, ``close`` being where its end tag starts.
+    """
+    parser = xml.parsers.expat.ParserCreate()
+    state = {"depth": 0, "id_attr": "rdf:ID", "start": 0, "rdf_id": None}
+
+    def start_element(name, attrs):
+        depth = state["depth"]
+        if depth == 0:
+            for attr, uri in attrs.items():
+                if attr.startswith("xmlns:"):
+                    if nsmap is not None:
+                        nsmap[attr[6:]] = uri
+                    if uri == RDF_NS:
+                        state["id_attr"] = f"{attr[6:]}:ID"
+        elif depth == 1:
+            state["start"] = parser.CurrentByteIndex
+            state["rdf_id"] = attrs.get(state["id_attr"])
+        state["depth"] = depth + 1
+
+    def end_element(name):
+        state["depth"] -= 1
+        if state["depth"] == 1:
+            # position of '</tag>' (or of the whole '<tag/>'); closed by the caller
+            pending.append((state["rdf_id"], state["start"], parser.CurrentByteIndex))
+
+    parser.StartElementHandler = start_element
+    parser.EndElementHandler = end_element
+    return parser
+
+
+def scan_spans(path, nsmap=None):
+    """
+    Yield (rdf_id, start, end) byte ranges of the top-level elements of
+    ``path`` in document order; ``end`` is one past the closing '>'.
+
+    ``nsmap`` (optional dict) is filled with the prefix -> uri declarations of
+    the root element.
+    """
+    pending = []
+    parser = _span_parser(nsmap, pending)
+    # an end tag is reported once its '>' is in, so it starts in this chunk or the one before
+    tail = b""
+    fed = 0
+    with open_input(path) as f:
+        while True:
+            chunk = f.read(READ_SIZE)
+            parser.Parse(chunk, not chunk)
+            window = tail + chunk
+            base = fed - len(tail)
+            fed += len(chunk)
+            for rdf_id, start, close in pending:
+                yield rdf_id, start, window.find(b">", close - base) + base + 1
+            pending.clear()
+            if not chunk:
+                break
+            tail = window[-READ_SIZE:]
+
+
+def scan_spans_data(data, offset=0):
+    """ ``scan_spans`` over a whole document held in ``data``, spans shifted by ``offset`` """
+    pending = []
+    _span_parser(None, pending).Parse(data, True)
+    return [(rdf_id, start + offset, data.find(b">", close) + 1 + offset)
+            for rdf_id, start, close in pending]
+
+
+def copy_spans(src_path, spans, out):
+    """ Write the ``(start, end)`` ranges of ``src_path`` to the binary stream ``out`` """
+    with SpanReader(src_path) as reader:
+        for start, end in spans:
+            out.write(expand_empty_tags(reader.read(start, end)))
+            out.write(b"\n")
+
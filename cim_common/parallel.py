@@ -0,0 +1,164 @@
+"""Parallel chunked parsing of the NMMS RDF/XML model.
+
+The model's CIM objects are all direct children of ``rdf:RDF``, so the file
+can be cut into chunks at top-level element starts (``<cim:Foo rdf:ID=...``).
+Each chunk is wrapped in a copy of the root start tag (which carries every
+namespace declaration) and the root end tag, parsed in its own process into
+records and byte spans, and the chunks are merged back in document order.
+
+``records_with_spans`` is what the index build and the columnar export read
+the model through; it parses serially for small files and where worker
+processes would re-run a script's top-level code (no ``fork``), unless
+``CIM_WORKERS`` / ``workers`` asks otherwise.  Compressed models cannot be
+cut without decompressing them, so they always stream through one parser.
+"""
+import io
+import mmap
+import multiprocessing
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from cim_common.compression import is_compressed, open_input
+from cim_common.loader import RDF_NS, CimModel, iter_records
+from cim_common.offsets import scan_spans, scan_spans_data
+
+PARALLEL_THRESHOLD = 64 << 20   # smaller models parse faster than a pool starts
+MIN_CHUNK_SIZE = 8 << 20
+CHUNKS_PER_WORKER = 4
+
+# a start tag, attribute values may hold '>' or '/'
+START_TAG = re.compile(rb"""<([^\s/>!?]+)((?:\s+[^\s=/>]+\s*=\s*(?:"[^"]*"|'[^']*'))*)\s*>""")
+XMLNS_ATTR = re.compile(rb"""xmlns:([^\s=]+)\s*=\s*(?:"([^"]*)"|'([^']*)')""")
+
+
+def _fork_context():
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return None
+
+
+def default_workers(model_path):
+    """
+    Worker processes for parsing ``model_path``: 1 if it is compressed, else
+    ``CIM_WORKERS`` if set, else every core for large models where workers
+    can be forked, else 1.
+    """
+    if is_compressed(model_path):
+        return 1
+    if os.environ.get("CIM_WORKERS"):
+        return max(1, int(os.environ["CIM_WORKERS"]))
+    if _fork_context() is None or os.path.getsize(model_path) < PARALLEL_THRESHOLD:
+        return 1
+    return os.cpu_count() or 1
+
+
+def root_tags(model_path, head_size=1 << 16):
+    """ (header, footer): the root start tag of ``model_path`` (and all before it) and its end tag """
+    with open_input(model_path) as f:
+        head = f.read(head_size)
+        root = START_TAG.search(head)
+        while root is None:
+            more = f.read(head_size)
+            if not more:
+                raise ValueError("No root element found")
+            head += more
+            root = START_TAG.search(head)
+    return head[:root.end()], b"</" + root.group(1) + b">"
+
+
+def split_chunks(mm, n_chunks):
+    """
+    (header, footer, [(start, end)]) of the mapped document ``mm``: the root
+    start/end tags and byte ranges of its body cut at top-level element starts.
+    """
+    root = START_TAG.search(mm)
+    if root is None:
+        raise ValueError("No root element found")
+    header = mm[:root.end()]
+    footer_start = mm.rfind(b"</" + root.group(1))
+    if footer_start < root.end():
+        raise ValueError("No root end tag found")
+    footer = mm[footer_start:]
+
+    rdf_prefix = b"rdf"
+    for m in XMLNS_ATTR.finditer(root.group(2)):
+        if (m.group(2) or m.group(3)) == RDF_NS.encode():
+            rdf_prefix = m.group(1)
+    element_start = re.compile(rb"<[^\s/>!?]+\s+" + re.escape(rdf_prefix) + rb":(?:ID|about)\s*=")
+
+    body_start, body_end = root.end(), footer_start
+    size = max(MIN_CHUNK_SIZE, (body_end - body_start) // max(n_chunks, 1) + 1)
+    cuts = [body_start]
+    pos = body_start + size
+    while pos < body_end:
+        m = element_start.search(mm, pos, body_end)
+        if m is None:
+            break
+        cuts.append(m.start())
+        pos = m.start() + size
+    cuts.append(body_end)
+    return header, footer, list(zip(cuts, cuts[1:]))
+
+
+def _parse_chunk(model_path, start, end, header, footer):
+    """ Worker: records and spans of the top-level elements in [start, end) """
+    with open(model_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        doc = header + mm[start:end] + footer
+    nsmap = {}
+    records = [rec for rec in iter_records(io.BytesIO(doc), nsmap) if rec.rdf_id]
+    spans = [(s, e) for rdf_id, s, e in scan_spans_data(doc, start - len(header)) if rdf_id]
+    if len(records) != len(spans):
+        raise ValueError(f"Chunk {start}-{end}: {len(records)} records but {len(spans)} spans")
+    return nsmap, records, spans
+
+
+def _iter_parallel(model_path, workers, nsmap):
+    with open(model_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        header, footer, chunks = split_chunks(mm, workers * CHUNKS_PER_WORKER)
+    context = _fork_context() or multiprocessing.get_context()
+    with ProcessPoolExecutor(workers, mp_context=context) as pool:
+        # keep a bounded window of chunks in flight so parsed results never pile up
+        pending = deque()
+        chunks = iter(chunks)
+        for start, end in chunks:
+            pending.append(pool.submit(_parse_chunk, model_path, start, end, header, footer))
+            if len(pending) >= 2 * workers:
+                break
+        while pending:
+            chunk_nsmap, records, spans = pending.popleft().result()
+            for start, end in chunks:
+                pending.append(pool.submit(_parse_chunk, model_path, start, end, header, footer))
+                break
+            if nsmap is not None:
+                for prefix, uri in chunk_nsmap.items():
+                    nsmap.setdefault(prefix, uri)
+            for rec, (start, end) in zip(records, spans):
+                yield rec, start, end
+
+
+def records_with_spans(model_path, nsmap=None, workers=None):
+    """
+    Yield (CimRecord, start, end) for every top-level element with an rdf:ID,
+    in document order, parsing with ``workers`` processes (default:
+    ``default_workers``).  ``nsmap`` is filled as by ``iter_records``.
+    """
+    workers = default_workers(model_path) if workers is None else workers
+    if workers > 1 and not is_compressed(model_path):
+        yield from _iter_parallel(model_path, workers, nsmap)
+        return
+    # records and byte spans come from two streaming readers kept in lockstep
+    spans = ((start, end) for rdf_id, start, end in scan_spans(model_path) if rdf_id)
+    for rec in iter_records(model_path, nsmap):
+        if rec.rdf_id:
+            start, end = next(spans)
+            yield rec, start, end
+
+
+def load_model(model_path, workers=None):
+    """ ``loader.load_model`` with the parse spread over ``workers`` processes """
+    model = CimModel()
+    for rec, _, _ in records_with_spans(model_path, model.nsmap, workers):
+        model.add(rec)
+    return model
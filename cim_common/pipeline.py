@@ -0,0 +1,128 @@
+"""Excel selection -> incremental or boundary region -> reference closure -> one output.
+
+Run separately, the scripts hand their results to each other through XML on
+disk: ``generated_incremental.py`` writes ``output_incremental.xml``,
+``modole_reduction.py`` reads it back as its delete file and parses the model
+once more.  ``Pipeline`` chains the same stages in memory over one
+``CompactModel``: the selected element set goes straight into the closure
+(its references come from the model arrays, not from a reparsed file), the
+boundary labels and component closures are loaded once and shared, and only
+the final file is written -- the selected elements followed by the injected
+ones, as ``modole_reduction.py`` writes its output::
+
+    python -m cim_common.pipeline NMMS_Model_CIM_Mar_ML1_1_03112025.xml --excel TNMP_SUBSTATIONS.xlsx \\
+        --where "ERCOT LOCATION=COAST" --stage boundary --out tnmp_closed.xml
+"""
+import argparse
+
+from cim_common.boundary import BoundaryRegions
+from cim_common.closure import ClosureCache
+from cim_common.incremental import all_ids, incremental_sets, scan_buckets
+from cim_common.instrument import metrics
+from cim_common.store import load_compact
+from cim_common.substations import load_substations
+from cim_common.writer import write_rdf
+
+STAGES = ("incremental", "boundary")
+
+
+class Pipeline:
+    """
+    Stages over one model, loaded once.  Each stage takes and returns plain
+    sets of rdf:IDs, so they can be chained in any order::
+
+        pipeline = Pipeline("model.xml")
+        ids = pipeline.boundary(names)
+        injected, not_found = pipeline.close(ids)
+        pipeline.write("output.xml", ids, injected)
+    """
+
+    def __init__(self, model_path, model=None):
+        self.model_path = model_path
+        with metrics.phase("open_index"):
+            self.model = model if model is not None else load_compact(model_path)
+        self._buckets = None
+        self._regions = None
+        self._closures = None
+
+    @property
+    def regions(self):
+        if self._regions is None:
+            with metrics.phase("boundary_labels"):
+                self._regions = BoundaryRegions(self.model)
+        return self._regions
+
+    @property
+    def closures(self):
+        if self._closures is None:
+            with metrics.phase("load_closures"):
+                self._closures = ClosureCache(self.model)
+        return self._closures
+
+    def incremental(self, names, verbose=False):
+        """ rdf:IDs of the incremental sets of the substations ``names`` (``generated_incremental.py``) """
+        if self._buckets is None:
+            self._buckets = scan_buckets(self.model)
+        with metrics.phase("incremental_sets"):
+            return all_ids(incremental_sets(self.model, set(names), self._buckets, verbose))
+
+    def boundary(self, names):
+        """ rdf:IDs of the boundary-broken region of ``names`` (``bfs_traverse_and_break_at_boundary.py``) """
+        regions = self.regions
+        with metrics.phase("select_region"):
+            return regions.region_ids(regions.substation_ids(names))
+
+    def close(self, ids, verbose=False):
+        """
+        (injected, not_found): the reference closure of the elements ``ids``
+        against the model, as ``modole_reduction.py`` computes it for a delete
+        file holding exactly those elements.
+        """
+        ids = set(ids)
+        closures = self.closures
+        with metrics.phase("reference_closure"):
+            referenced = {ref for refs in map(self.model.refs, ids) if refs for _, ref in refs}
+            return closures.reference_closure(ids, referenced - ids, verbose)
+
+    def write(self, output_file, ids, injected=(), level=None):
+        """ Write the elements ``ids`` and then ``injected``, each in model order; returns the count """
+        with metrics.phase("serialize"):
+            return write_rdf(output_file, self.model.nsmap, [(self.model_path, self.model.spans(ids)),
+                                                             (self.model_path, self.model.spans(injected))],
+                             level=level)
+
+    def run(self, names, output_file, stage="incremental", closure=True, verbose=False):
+        """ Select, close and write in one go; returns (selected, injected, not_found) """
+        if stage not in STAGES:
+            raise ValueError(f"Unknown stage {stage!r}, expected one of {STAGES}")
+        ids = self.incremental(names, verbose) if stage == "incremental" else self.boundary(names)
+        injected, not_found = self.close(ids, verbose) if closure else (set(), set())
+        self.write(output_file, ids, injected)
+        return ids, injected, not_found
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Select substations, extract, close and write in one process.")
+    parser.add_argument("model", help="NMMS CIM XML file")
+    parser.add_argument("--excel", default="TNMP_SUBSTATIONS.xlsx", help="substation spreadsheet")
+    parser.add_argument("--where", action="append", default=[], metavar="COLUMN=VALUE",
+                        help="only spreadsheet rows with this value (repeatable)")
+    parser.add_argument("--stage", choices=STAGES, default="incremental",
+                        help="incremental sets or the boundary-broken region")
+    parser.add_argument("--no-closure", action="store_true", help="write the selected elements only")
+    parser.add_argument("--out", default="output.xml", help="the one file written")
+    parser.add_argument("--verbose", action="store_true", help="report each stage as the scripts do")
+    args = parser.parse_args()
+
+    where = dict(item.split("=", 1) for item in args.where)
+    with metrics.phase("load_excel"):
+        names = load_substations(args.excel).names(where)
+    print(f"Loaded {len(names)} substation names.")
+
+    ids, injected, not_found = Pipeline(args.model).run(names, args.out, args.stage,
+                                                        closure=not args.no_closure, verbose=args.verbose)
+    print(f"📦 Selected ({args.stage}): {len(ids)}")
+    print(f"🔗 Injected by the reference closure: {len(injected)}")
+    if not_found:
+        print(f"❌ Unresolved references: {len(not_found)}")
+    print(f"💾 Written to: {args.out}")
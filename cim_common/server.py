@@ -0,0 +1,270 @@
+"""Long-running local model server for low-latency subgraph queries.
+
+Loads the CIM model once as an array-backed ``CompactModel`` (and the
+boundary labels on first use), then answers JSON requests over localhost HTTP:
+
+    POST /closure      {"ids": [...]} or {"delete_file": "..."}
+                       reference closure, as in modole_reduction.py
+    POST /region       {"substations": ["ALVIN", ...]}
+                       boundary-broken substation region, as in
+                       bfs_traverse_and_break_at_boundary.py
+    POST /incremental  {"substations": ["ALVIN", ...]}
+                       incremental set, as in generated_incremental.py
+    GET  /status
+
+Any POST may add ``"output": "path.xml"`` to also have the result written as
+an RDF file.  ``delete_file`` and ``output`` paths are resolved in, and
+confined to, the ``--workdir`` folder.  Results are kept in an LRU keyed by the request.  With
+``--watch`` the server polls the model file (or, for a folder, the newest
+``NMMS_Model_CIM_*`` file in it), rebuilds everything in the background when
+a new one arrives and swaps it in; requests keep being answered from the old
+model meanwhile.
+
+    python -m cim_common.server C:/Users/ywang2/work/CIM --watch --workdir C:/Users/ywang2/work/runs
+"""
+import argparse
+import glob
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cim_common.boundary import BoundaryRegions
+from cim_common.closure import ClosureCache, read_delete_file, write_closure_output
+from cim_common.compression import is_compressed
+from cim_common.incremental import all_ids, incremental_sets, scan_buckets
+from cim_common.index import model_fingerprint
+from cim_common.store import load_compact
+from cim_common.writer import write_rdf
+
+MODEL_PATTERN = "NMMS_Model_CIM_*.xml"
+
+
+class LruCache:
+    """ Small thread-safe LRU of request -> result """
+
+    def __init__(self, size):
+        self.size = size
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            if key in self.items:
+                self.items.move_to_end(key)
+                self.hits += 1
+                return self.items[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self.lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+            while len(self.items) > self.size:
+                self.items.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+class ModelState:
+    """ One loaded model: its compact arrays plus lazily built query structures """
+
+    def __init__(self, model_path):
+        self.model_path = model_path
+        self.fingerprint = model_fingerprint(model_path)
+        self.model = load_compact(model_path)
+        self.closures = ClosureCache(self.model)
+        self.loaded_at = time.time()
+        self.lock = threading.RLock()  # the caches are filled one query at a time
+        self._buckets = None
+        self._regions = None
+
+    @property
+    def buckets(self):
+        with self.lock:
+            if self._buckets is None:
+                self._buckets = scan_buckets(self.model)
+            return self._buckets
+
+    @property
+    def regions(self):
+        with self.lock:
+            if self._regions is None:
+                self._regions = BoundaryRegions(self.model)
+            return self._regions
+
+    def closure(self, request):
+        with self.lock:
+            if "delete_file" in request:
+                existing_ids, referenced_ids = read_delete_file(request["delete_file"])
+                missing_ids = referenced_ids - existing_ids
+            else:
+                existing_ids, missing_ids = set(), set(request["ids"])
+            injected, not_found = self.closures.reference_closure(existing_ids, missing_ids)
+        return {"ids": sorted(injected), "not_found": sorted(not_found)}
+
+    def region(self, request):
+        regions = self.regions
+        with self.lock:
+            ids = regions.region_ids(regions.substation_ids(request["substations"]))
+        return {"ids": sorted(ids)}
+
+    def incremental(self, request):
+        buckets = self.buckets
+        with self.lock:
+            ids = all_ids(incremental_sets(self.model, request["substations"], buckets, verbose=False))
+        return {"ids": sorted(ids)}
+
+    def write(self, request, result):
+        """ Write ``result`` to ``request["output"]`` as an RDF file """
+        with self.lock:
+            if "delete_file" in request:
+                write_closure_output(request["output"], request["delete_file"], self.model, result["ids"])
+            else:
+                write_rdf(request["output"], self.model.nsmap,
+                          [(self.model_path, self.model.spans(result["ids"]))])
+
+
+def latest_model(path):
+    """ ``path`` itself, or the newest (possibly compressed) NMMS model file in the folder ``path`` """
+    if not os.path.isdir(path):
+        return path
+    candidates = glob.glob(os.path.join(path, MODEL_PATTERN))
+    candidates += [p for p in glob.glob(os.path.join(path, MODEL_PATTERN + ".*"))
+                   if is_compressed(p)]
+    if not candidates:
+        raise FileNotFoundError(f"No {MODEL_PATTERN} in {path}")
+    return max(candidates, key=os.path.getmtime)
+
+
+class ModelServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, model_source, cache_size=256, workdir="."):
+        super().__init__(address, RequestHandler)
+        self.model_source = model_source
+        self.workdir = os.path.realpath(workdir)
+        self.cache = LruCache(cache_size)
+        self.state = ModelState(latest_model(model_source))
+        self.reloading = False
+
+    def resolve(self, path):
+        """ ``path`` resolved in the working folder; ValueError if it points outside it """
+        full = os.path.realpath(os.path.join(self.workdir, path))
+        if os.path.commonpath([full, self.workdir]) != self.workdir:
+            raise ValueError(f"{path} is outside the working folder {self.workdir}")
+        return full
+
+    def check_for_new_model(self):
+        """ Load a new/changed model in this (background) thread and swap it in """
+        path = latest_model(self.model_source)
+        if path == self.state.model_path and model_fingerprint(path) == self.state.fingerprint:
+            return False
+        print(f"🔄 New model detected: {path}")
+        self.reloading = True
+        try:
+            state = ModelState(path)
+        finally:
+            self.reloading = False
+        self.state = state
+        self.cache.clear()
+        print(f"✅ Now serving {path}")
+        return True
+
+    def watch(self, interval):
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.check_for_new_model()
+                except Exception as exc:  # keep serving the old model
+                    print(f"❌ Reload failed: {exc}")
+        threading.Thread(target=loop, daemon=True).start()
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    routes = {"/closure": "closure", "/region": "region", "/incremental": "incremental"}
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_request(self):
+        """ The JSON body: an object whose ID lists hold strings and whose paths lie in the working folder """
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not isinstance(request, dict):
+            raise ValueError("the request body must be a JSON object")
+        for key in ("ids", "substations"):
+            values = request.get(key, [])
+            if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+                raise ValueError(f"{key!r} must be a list of strings")
+        for key in ("delete_file", "output"):
+            if key in request:
+                if not isinstance(request[key], str):
+                    raise ValueError(f"{key!r} must be a path")
+                request[key] = self.server.resolve(request[key])
+        return request
+
+    def do_GET(self):
+        if self.path != "/status":
+            return self._reply(404, {"error": f"unknown path {self.path}"})
+        server = self.server
+        self._reply(200, {
+            "model": server.state.model_path,
+            "fingerprint": server.state.fingerprint,
+            "loaded_at": server.state.loaded_at,
+            "reloading": server.reloading,
+            "cache": {"entries": len(server.cache.items), "hits": server.cache.hits,
+                      "misses": server.cache.misses},
+        })
+
+    def do_POST(self):
+        method = self.routes.get(self.path)
+        if method is None:
+            return self._reply(404, {"error": f"unknown path {self.path}"})
+        try:
+            request = self._read_request()
+            state = self.server.state
+            query = {k: v for k, v in request.items() if k != "output"}
+            if "delete_file" in request:  # a rewritten delete file is a new query
+                query["delete_file_fingerprint"] = model_fingerprint(request["delete_file"])
+            key = (state.fingerprint, self.path, json.dumps(query, sort_keys=True))
+            result = self.server.cache.get(key)
+            if result is None:
+                result = getattr(state, method)(request)
+                self.server.cache.put(key, result)
+            if request.get("output"):
+                state.write(request, result)
+        except (KeyError, ValueError, OSError) as exc:
+            return self._reply(400, {"error": str(exc)})
+        self._reply(200, result)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve subgraph queries against a loaded CIM model.")
+    parser.add_argument("model", help="CIM model file, or a folder holding NMMS_Model_CIM_* files")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--cache-size", type=int, default=256, help="LRU entries")
+    parser.add_argument("--watch", action="store_true", help="reload when a new model file arrives")
+    parser.add_argument("--interval", type=float, default=60, help="seconds between model checks")
+    parser.add_argument("--workdir", default=".", help="folder that delete_file and output paths are confined to")
+    args = parser.parse_args()
+
+    server = ModelServer((args.host, args.port), args.model, args.cache_size, args.workdir)
+    if args.watch:
+        server.watch(args.interval)
+    print(f"🚀 Serving {server.state.model_path} on http://{args.host}:{args.port}")
+    server.serve_forever()
@@ -0,0 +1,286 @@
+"""Compact, array-backed in-memory CIM model.
+
+The traversals only ever need an element's rdf:ID, class, name and its
+``rdf:resource`` targets, so ``CompactModel`` keeps exactly that and nothing
+per element as Python objects:
+
+* rdf:IDs in one fixed-width bytes array, looked up by binary search
+  (``IdTable``); elements are ints in document order, referenced-but-undefined
+  IDs are appended after them
+* class and predicate names interned into small tables, stored as uint16 codes
+* names as one UTF-8 blob plus offsets
+* references as CSR buffers (``ref_indptr`` per element, ``ref_pred`` /
+  ``ref_dst`` per reference)
+* the element's byte span in the model file; the body is only read (from an
+  mmap of the model, see ``compression.SpanReader``) for elements that are
+  actually written out or asked for
+
+It answers the same queries as ``ModelIndex`` (``refs``, ``scan_classes``,
+``referrers_of``, ``spans`` ...), so the closure, incremental and boundary
+code runs on either.
+"""
+import xml.etree.ElementTree as ET
+from array import array
+
+import numpy as np
+
+from cim_common.compression import SpanReader
+from cim_common.graph import CsrGraph, csr_from_edges
+from cim_common.index import open_index
+from cim_common.offsets import expand_empty_tags
+
+FETCH_SIZE = 100_000
+
+
+class IdTable:
+    """ int <-> rdf:ID over a fixed-width bytes array, searched through a sort order """
+
+    def __init__(self, keys):
+        self.keys = keys
+        self.order = np.argsort(keys, kind="stable")
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __getitem__(self, i):
+        return self.keys[i].decode("utf-8")
+
+    def _search(self, keys):
+        if not len(self.keys):
+            return np.full(len(keys), -1, dtype=np.int64)
+        wanted = keys.astype(self.keys.dtype)
+        pos = np.minimum(np.searchsorted(self.keys, wanted, sorter=self.order), len(self.keys) - 1)
+        nodes = self.order[pos].astype(np.int64)
+        # a wider key was truncated by the dtype cast, so it cannot match
+        too_long = np.char.str_len(keys) > self.keys.itemsize
+        nodes[(self.keys[nodes] != wanted) | too_long] = -1
+        return nodes
+
+    def lookup(self, rdf_ids):
+        """ Int of each of ``rdf_ids`` (-1 where unknown), as an int64 array """
+        if not len(rdf_ids):
+            return np.zeros(0, dtype=np.int64)
+        return self._search(np.array([rid.encode("utf-8") for rid in rdf_ids], dtype=bytes))
+
+    def lookup_table(self, other):
+        """ Int of each of the IDs of the IdTable ``other`` (-1 where unknown) """
+        if not len(other):
+            return np.zeros(0, dtype=np.int64)
+        return self._search(other.keys)
+
+    def get(self, rdf_id):
+        node = int(self.lookup([rdf_id])[0])
+        return None if node < 0 else node
+
+    def to_ids(self, nodes):
+        return [key.decode("utf-8") for key in self.keys[np.asarray(nodes, dtype=np.int64)].tolist()]
+
+
+def _bytes_array(chunks):
+    """ One 'S' array from a list of lists of bytes """
+    parts = [np.array(chunk, dtype=bytes) for chunk in chunks if chunk]
+    if not parts:
+        return np.zeros(0, dtype="S1")
+    width = max(part.itemsize for part in parts)
+    return np.concatenate([part.astype(f"S{width}") for part in parts])
+
+
+class CompactModel:
+    """ Read-only model of flat arrays; build it with ``from_index`` """
+
+    def __init__(self, model_path, nsmap, ids, n_defined, classes, cls_codes,
+                 name_blob, name_offsets, predicates, ref_indptr, ref_pred, ref_dst, starts, ends):
+        self.model_path = model_path
+        self.nsmap = nsmap
+        self.ids = ids                      # IdTable, defined elements first
+        self.n_defined = n_defined
+        self.classes = classes              # code -> class name
+        self.cls_codes = cls_codes          # per element
+        self.name_blob = name_blob
+        self.name_offsets = name_offsets    # per element, plus one
+        self.predicates = predicates        # code -> predicate name
+        self.ref_indptr = ref_indptr        # per element, plus one
+        self.ref_pred = ref_pred            # per reference
+        self.ref_dst = ref_dst              # per reference, int into ``ids``
+        self.starts = starts
+        self.ends = ends
+
+    @classmethod
+    def from_index(cls, model_index):
+        """ Bulk-load a ``ModelIndex`` into arrays (no XML parse) """
+        conn = model_index.conn
+        class_codes = {}
+        cls_codes = array("H")
+        id_chunks = []
+        name_blob = bytearray()
+        name_offsets = array("q", [0])
+        starts = array("q")
+        ends = array("q")
+        cursor = conn.execute("SELECT rdf_id, cls, name, start, end FROM elements ORDER BY idx")
+        while True:
+            rows = cursor.fetchmany(FETCH_SIZE)
+            if not rows:
+                break
+            id_chunks.append([row[0].encode("utf-8") for row in rows])
+            for _, cls_name, name, start, end in rows:
+                cls_codes.append(class_codes.setdefault(cls_name, len(class_codes)))
+                if name:
+                    name_blob += name.encode("utf-8")
+                name_offsets.append(len(name_blob))
+                starts.append(start)
+                ends.append(end)
+        n_defined = len(cls_codes)
+
+        # references, with undefined targets interned after the defined elements
+        pred_codes = {}
+        undefined = {}
+        src = array("q")
+        ref_pred = array("H")
+        ref_dst = array("q")
+        cursor = conn.execute(
+            "SELECT r.src, r.predicate, e.idx, r.dst FROM refs r "
+            "LEFT JOIN elements e ON e.rdf_id = r.dst ORDER BY r.rowid")
+        while True:
+            rows = cursor.fetchmany(FETCH_SIZE)
+            if not rows:
+                break
+            for s, pred, d, ref in rows:
+                if d is None:
+                    d = undefined.get(ref)
+                    if d is None:
+                        d = undefined[ref] = n_defined + len(undefined)
+                src.append(s)
+                ref_pred.append(pred_codes.setdefault(pred, len(pred_codes)))
+                ref_dst.append(d)
+        id_chunks.append([ref.encode("utf-8") for ref in undefined])
+
+        # refs rows are written element by element, so rowid order is grouped by src
+        ref_indptr = np.zeros(n_defined + 1, dtype=np.int64)
+        np.cumsum(np.bincount(np.frombuffer(src, dtype=np.int64), minlength=n_defined), out=ref_indptr[1:])
+        return cls(
+            model_path=model_index.model_path,
+            nsmap=model_index.nsmap,
+            ids=IdTable(_bytes_array(id_chunks)),
+            n_defined=n_defined,
+            classes=list(class_codes),
+            cls_codes=np.frombuffer(cls_codes, dtype=np.uint16).copy(),
+            name_blob=bytes(name_blob),
+            name_offsets=np.frombuffer(name_offsets, dtype=np.int64).copy(),
+            predicates=list(pred_codes),
+            ref_indptr=ref_indptr,
+            ref_pred=np.frombuffer(ref_pred, dtype=np.uint16).copy(),
+            ref_dst=np.frombuffer(ref_dst, dtype=np.int64).astype(np.int32),
+            starts=np.frombuffer(starts, dtype=np.int64).copy(),
+            ends=np.frombuffer(ends, dtype=np.int64).copy(),
+        )
+
+    # --- per-element queries (same answers as ModelIndex) ---
+
+    def __len__(self):
+        return self.n_defined
+
+    def _element(self, rdf_id):
+        node = self.ids.get(rdf_id)
+        return node if node is not None and node < self.n_defined else None
+
+    def __contains__(self, rdf_id):
+        return self._element(rdf_id) is not None
+
+    def _name(self, node):
+        name = self.name_blob[self.name_offsets[node]:self.name_offsets[node + 1]]
+        return name.decode("utf-8") if name else None
+
+    def _refs(self, node):
+        lo, hi = self.ref_indptr[node], self.ref_indptr[node + 1]
+        preds = self.ref_pred[lo:hi].tolist()
+        dsts = self.ids.to_ids(self.ref_dst[lo:hi])
+        return [(self.predicates[p], d) for p, d in zip(preds, dsts)]
+
+    def cls(self, rdf_id):
+        node = self._element(rdf_id)
+        return None if node is None else self.classes[self.cls_codes[node]]
+
+    def name(self, rdf_id):
+        node = self._element(rdf_id)
+        return None if node is None else self._name(node)
+
+    def refs(self, rdf_id):
+        """ [(predicate, target ID)] of ``rdf_id``, or None if it is not in the model """
+        node = self._element(rdf_id)
+        return None if node is None else self._refs(node)
+
+    def body(self, rdf_id):
+        """ The element's XML exactly as in the model file (self-closing tags expanded) """
+        node = self._element(rdf_id)
+        if node is None:
+            return None
+        with SpanReader(self.model_path) as reader:
+            return expand_empty_tags(reader.read(int(self.starts[node]), int(self.ends[node])))
+
+    def element(self, rdf_id):
+        """ The element parsed from the model file, for the few that need a tree """
+        body = self.body(rdf_id)
+        if body is None:
+            return None
+        decls = " ".join(f'xmlns:{prefix}="{uri}"' for prefix, uri in self.nsmap.items())
+        return ET.fromstring(f"<root {decls}>".encode("utf-8") + body + b"</root>")[0]
+
+    # --- set queries ---
+
+    def _class_nodes(self, cls_name):
+        if cls_name not in self.classes:
+            return np.zeros(0, dtype=np.int64)
+        return np.flatnonzero(self.cls_codes == self.classes.index(cls_name))
+
+    def ids_of_class(self, cls_name):
+        return self.ids.to_ids(self._class_nodes(cls_name))
+
+    def scan_classes(self, classes):
+        """ {cls: {rdf_id: (name, refs)}} with each bucket in document order """
+        buckets = {}
+        for cls_name in classes:
+            nodes = self._class_nodes(cls_name).tolist()
+            buckets[cls_name] = {rid: (self._name(node), self._refs(node))
+                                 for rid, node in zip(self.ids.to_ids(nodes), nodes)}
+        return buckets
+
+    def _nodes(self, rdf_ids):
+        nodes = self.ids.lookup(list(rdf_ids))
+        return nodes[nodes >= 0]
+
+    def existing(self, rdf_ids):
+        """ The subset of ``rdf_ids`` defined in the model """
+        nodes = self._nodes(rdf_ids)
+        return set(self.ids.to_ids(nodes[nodes < self.n_defined]))
+
+    def referrers_of(self, rdf_ids):
+        """ rdf:IDs of the elements that reference any of ``rdf_ids`` """
+        mask = np.zeros(len(self.ids), dtype=bool)
+        mask[self._nodes(rdf_ids)] = True
+        hits = np.flatnonzero(mask[self.ref_dst])
+        srcs = np.unique(np.searchsorted(self.ref_indptr, hits, side="right") - 1)
+        return set(self.ids.to_ids(srcs))
+
+    def spans(self, rdf_ids):
+        """ Sorted (start, end) byte ranges in the model file of the defined ``rdf_ids`` """
+        nodes = self._nodes(rdf_ids)
+        nodes = np.unique(nodes[nodes < self.n_defined])
+        return list(zip(self.starts[nodes].tolist(), self.ends[nodes].tolist()))
+
+    def graph(self):
+        """ The undirected CSR reference graph, sharing this model's ID table """
+        src = np.repeat(np.arange(self.n_defined, dtype=np.int64), np.diff(self.ref_indptr))
+        indptr, indices = csr_from_edges(len(self.ids), src, self.ref_dst.astype(np.int64))
+        return CsrGraph(self.ids, self.n_defined, indptr, indices)
+
+    def nbytes(self):
+        """ Approximate memory held by the arrays """
+        arrays = (self.ids.keys, self.ids.order, self.cls_codes, self.name_offsets,
+                  self.ref_indptr, self.ref_pred, self.ref_dst, self.starts, self.ends)
+        return sum(a.nbytes for a in arrays) + len(self.name_blob)
+
+
+def load_compact(model_path, **index_options):
+    """ The CompactModel of ``model_path``, via its (cached) index """
+    with open_index(model_path, **index_options) as model_index:
+        return CompactModel.from_index(model_index)
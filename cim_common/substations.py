@@ -0,0 +1,117 @@
+"""The substation spreadsheet (TNMP_SUBSTATIONS.xlsx), cached next to itself.
+
+Reading the workbook through pandas/openpyxl costs seconds before any XML
+work starts, on every run.  ``load_substations`` reads it once and keeps its
+columns as plain Python lists in ``<sheet>.sheet.pkl``; later runs load the
+pickle without importing pandas at all.  The cache is used while the
+workbook's size and mtime are unchanged, or -- when only the mtime moved, as
+after a copy or a save without edits -- while its content hash still matches.
+
+    sheet = load_substations("TNMP_SUBSTATIONS.xlsx")
+    names = sheet.names(where={"ERCOT LOCATION": "COAST"})
+"""
+import hashlib
+import os
+import pickle
+
+SHEET_VERSION = "1"
+NAME_COLUMN = "ERCOT SUB NAME"
+
+
+def sheet_cache_path_for(path):
+    return f"{path}.sheet.pkl"
+
+
+def _file_hash(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_excel(path):
+    """ {column: [value or None]} of the first sheet of the workbook """
+    import pandas as pd  # only on a cold cache
+
+    df = pd.read_excel(path)
+    return {str(column): [None if pd.isna(value) else value for value in df[column].tolist()]
+            for column in df.columns}
+
+
+def _match(value, wanted):
+    return value is not None and str(value) == str(wanted)
+
+
+class SubstationSheet:
+    """ Columns of the substation spreadsheet as lists, one entry per row """
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()), []))
+
+    def column(self, name):
+        return self.columns[name]
+
+    def _rows(self, where):
+        rows = range(len(self))
+        for column, wanted in (where or {}).items():
+            values = self.columns[column]
+            rows = [i for i in rows if _match(values[i], wanted)]
+        return rows
+
+    def names(self, where=None, column=NAME_COLUMN):
+        """ Names in ``column`` of the rows where each ``column: value`` of ``where`` holds """
+        values = self.columns[column]
+        return {str(values[i]) for i in self._rows(where) if values[i] is not None}
+
+    def groups(self, by, column=NAME_COLUMN):
+        """ {value of ``by``: names of its rows}, in sorted order of the values """
+        keys, values = self.columns[by], self.columns[column]
+        groups = {}
+        for key, value in zip(keys, values):
+            if key is not None and value is not None:
+                groups.setdefault(key, set()).add(str(value))
+        return {key: groups[key] for key in sorted(groups)}
+
+
+def _load_cache(cache_path, stat):
+    try:
+        with open(cache_path, "rb") as f:
+            cached = pickle.load(f)
+        if (cached.get("version") != SHEET_VERSION or cached.get("size") != stat.st_size
+                or not {"columns", "hash", "mtime_ns"} <= cached.keys()):
+            return None
+    except Exception:  # unreadable, truncated or from another version: rebuilding is always safe
+        return None
+    return cached
+
+
+def _save_cache(cache_path, cached):
+    try:
+        with open(cache_path + ".tmp", "wb") as f:
+            pickle.dump(cached, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(cache_path + ".tmp", cache_path)
+    except OSError:
+        pass  # a read-only folder only costs the next run the Excel read
+
+
+def load_substations(path="TNMP_SUBSTATIONS.xlsx", cache=True):
+    """ The SubstationSheet of the workbook at ``path``, from its cache when still valid """
+    if not cache:
+        return SubstationSheet(_read_excel(path))
+    stat = os.stat(path)
+    cache_path = sheet_cache_path_for(path)
+    cached = _load_cache(cache_path, stat)
+    if cached is not None and cached["mtime_ns"] == stat.st_mtime_ns:
+        return SubstationSheet(cached["columns"])
+
+    content_hash = _file_hash(path)
+    if cached is None or cached["hash"] != content_hash:
+        cached = {"version": SHEET_VERSION, "size": stat.st_size, "hash": content_hash,
+                  "columns": _read_excel(path)}
+    cached["mtime_ns"] = stat.st_mtime_ns
+    _save_cache(cache_path, cached)
+    return SubstationSheet(cached["columns"])
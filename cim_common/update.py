@@ -0,0 +1,200 @@
+"""Update last month's index (and boundary labels) to a new NMMS model.
+
+Most of a new monthly model is byte-for-byte what it was the month before.
+``update_index`` streams the new file once through the span scanner only,
+hashes every top-level element (``index.element_digest``) and compares the
+hashes with the previous index: unchanged elements keep their class, name and
+references from the old index (copied inside SQLite), and only the added and
+changed elements are parsed.  The result is the same index ``build_index``
+writes for the new model, and the differences come back as a ``ModelDiff``.
+
+``update_labels`` then repairs the saved substation-origin labels of the old
+model locally (see ``labels.repair_labels``) instead of rerunning the whole
+boundary BFS.
+
+    python -m cim_common.update NMMS_Model_CIM_Mar_ML1_1_03112025.xml NMMS_Model_CIM_Apr_ML1_1_04082025.xml
+"""
+import argparse
+import io
+import os
+import sqlite3
+from collections import namedtuple
+from itertools import chain
+
+from cim_common.boundary import substation_names
+from cim_common.compression import SpanReader
+from cim_common.index import (BATCH_SIZE, INDEX_VERSION, INDEXES, SCHEMA, element_digest, index_path_for,
+                              model_fingerprint, open_index)
+from cim_common.instrument import metrics
+from cim_common.labels import compute_labels, labels_path_for, load_labels, repair_labels
+from cim_common.loader import iter_records
+from cim_common.offsets import scan_spans
+from cim_common.parallel import root_tags
+from cim_common.store import CompactModel
+
+# Sets of rdf:IDs; ``touched`` holds the reference targets of the added,
+# removed and changed elements, before and after the update.
+ModelDiff = namedtuple("ModelDiff", ["added", "removed", "changed", "touched"])
+
+PARSE_BATCH_BYTES = 16 << 20
+
+
+def _parse_spans(reader, header, footer, spans, nsmap):
+    """
+    (key, CimRecord) of the elements at ``spans``, an iterable of (key, start,
+    end) read through ``reader`` (a ``SpanReader``), parsed a batch at a time.
+    Any order works; file order is the one a compressed model reads fastest.
+    """
+    batch, size = [], 0
+    for span in chain(spans, [None]):
+        if span is not None:
+            batch.append(span)
+            size += span[2] - span[1]
+            if size < PARSE_BATCH_BYTES:
+                continue
+        if not batch:
+            break
+        doc = header + b"\n".join(reader.read(start, end) for _, start, end in batch) + footer
+        records = [rec for rec in iter_records(io.BytesIO(doc), nsmap) if rec.rdf_id]
+        if len(records) != len(batch):
+            raise ValueError(f"Parsed {len(records)} elements from {len(batch)} spans")
+        yield from zip((idx for idx, _, _ in batch), records)
+        batch, size = [], 0
+
+
+def update_index(old_index_path, model_path, index_path=None, use_hash=False):
+    """
+    Write the index of ``model_path`` from the previous model's index at
+    ``old_index_path``; returns (index path, ModelDiff).
+    """
+    index_path = index_path or index_path_for(model_path)
+    tmp_path = index_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    with metrics.phase("index_update", model=model_path) as phase:
+        conn = sqlite3.connect(tmp_path)
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("PRAGMA temp_store = FILE")
+        conn.executescript(SCHEMA)
+        conn.execute("ATTACH DATABASE ? AS old", (old_index_path,))
+        old_meta = dict(conn.execute("SELECT key, value FROM old.meta"))
+        if old_meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"{old_index_path} is index version {old_meta.get('version')}, "
+                             f"not {INDEX_VERSION}; rebuild it first")
+
+        # --- hash every top-level element of the new model ---
+        conn.execute("CREATE TEMP TABLE scan (idx INTEGER PRIMARY KEY, rdf_id TEXT, start INTEGER, "
+                     "end INTEGER, digest INTEGER)")
+        nsmap = {}
+        rows = []
+        n_elements = 0
+        with SpanReader(model_path) as reader:
+            for rdf_id, start, end in scan_spans(model_path, nsmap):
+                if not rdf_id:
+                    continue
+                rows.append((n_elements, rdf_id, start, end, element_digest(reader.read(start, end))))
+                n_elements += 1
+                if len(rows) >= BATCH_SIZE:
+                    conn.executemany("INSERT INTO scan VALUES (?, ?, ?, ?, ?)", rows)
+                    rows.clear()
+            conn.executemany("INSERT INTO scan VALUES (?, ?, ?, ?, ?)", rows)
+            conn.execute("CREATE UNIQUE INDEX temp.scan_rdf_id ON scan (rdf_id)")
+
+            # unchanged: same rdf:ID and digest (and the prefixes mean the same)
+            same_prefixes = nsmap == dict(conn.execute("SELECT prefix, uri FROM old.nsmap"))
+            conn.execute("CREATE TEMP TABLE same (idx INTEGER PRIMARY KEY, old_idx INTEGER)")
+            if same_prefixes:
+                conn.execute("INSERT INTO same SELECT s.idx, o.idx FROM scan s "
+                             "JOIN old.elements o ON o.rdf_id = s.rdf_id AND o.digest = s.digest")
+            conn.execute("CREATE INDEX temp.same_old_idx ON same (old_idx)")
+            conn.execute("INSERT INTO elements SELECT s.idx, s.rdf_id, o.cls, o.name, s.start, s.end, s.digest "
+                         "FROM scan s JOIN same USING (idx) JOIN old.elements o ON o.idx = same.old_idx")
+
+            # --- parse only the added and changed elements ---
+            header, footer = root_tags(model_path)
+            spans = conn.execute("SELECT idx, start, end FROM scan WHERE idx NOT IN (SELECT idx FROM same) "
+                                 "ORDER BY idx").fetchall()
+            conn.execute("CREATE TEMP TABLE newrefs (src INTEGER, seq INTEGER, predicate TEXT, dst TEXT)")
+            element_rows = []
+            ref_rows = []
+            for idx, rec in _parse_spans(reader, header, footer, spans, nsmap):
+                element_rows.append((idx, rec.rdf_id, rec.cls, rec.name))
+                ref_rows.extend((idx, seq, pred, dst) for seq, (pred, dst) in enumerate(rec.refs))
+            conn.executemany("INSERT INTO elements SELECT ?, ?, ?, ?, start, end, digest FROM scan "
+                             "WHERE idx = ?", [row + (row[0],) for row in element_rows])
+            conn.executemany("INSERT INTO newrefs VALUES (?, ?, ?, ?)", ref_rows)
+        metrics.count("elements_parsed", len(element_rows))
+
+        # refs in rowid order grouped by src, as build_index writes them
+        conn.execute(
+            "INSERT INTO refs SELECT src, predicate, dst FROM ("
+            "SELECT same.idx AS src, r.rowid AS seq, r.predicate, r.dst FROM same "
+            "JOIN old.refs r ON r.src = same.old_idx "
+            "UNION ALL SELECT src, seq, predicate, dst FROM newrefs) ORDER BY src, seq")
+        metrics.count("elements_indexed", n_elements)
+
+        # --- differences from the old index ---
+        added = {row[0] for row in conn.execute(
+            "SELECT rdf_id FROM scan s WHERE NOT EXISTS "
+            "(SELECT 1 FROM old.elements o WHERE o.rdf_id = s.rdf_id)")}
+        removed = {row[0] for row in conn.execute(
+            "SELECT rdf_id FROM old.elements o WHERE NOT EXISTS "
+            "(SELECT 1 FROM scan s WHERE s.rdf_id = o.rdf_id)")}
+        changed = {rec[1] for rec in element_rows} - added
+        touched = {row[0] for row in conn.execute(
+            "SELECT r.dst FROM old.refs r WHERE NOT EXISTS (SELECT 1 FROM same WHERE same.old_idx = r.src) "
+            "UNION SELECT dst FROM newrefs")}
+        phase.fields.update(added=len(added), removed=len(removed), changed=len(changed))
+
+        conn.executescript(INDEXES)
+        conn.executemany("INSERT INTO nsmap VALUES (?, ?)", nsmap.items())
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ("version", INDEX_VERSION),
+            ("model_path", os.path.abspath(model_path)),
+            ("fingerprint", model_fingerprint(model_path, use_hash)),
+        ])
+        conn.commit()
+        conn.execute("DETACH DATABASE old")
+        conn.close()
+    os.replace(tmp_path, index_path)
+    return index_path, ModelDiff(added, removed, changed, touched)
+
+
+def update_labels(old_model_path, model_path, model, diff, workers=None):
+    """
+    Save the boundary labels of ``model`` (the new model's CompactModel),
+    repaired from ``old_model_path``'s saved labels when there are any.
+    """
+    source_ids = sorted(substation_names(model))
+    graph = model.graph()
+    old = load_labels(old_model_path)
+    with metrics.phase("update_labels", repaired=old is not None):
+        if old is None:
+            state = compute_labels(graph, source_ids, workers)
+        else:
+            state = repair_labels(old, graph, source_ids,
+                                  diff.added | diff.removed | diff.changed | diff.touched, workers)
+    return state.save(labels_path_for(model_path), model_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index a new CIM model from the previous model's index.")
+    parser.add_argument("old_model", help="previous NMMS CIM XML file (its index must exist)")
+    parser.add_argument("model", help="new NMMS CIM XML file")
+    parser.add_argument("--hash", action="store_true", help="key the new index on the file's SHA-256 as well")
+    parser.add_argument("--no-labels", action="store_true", help="do not update the boundary labels")
+    parser.add_argument("--workers", type=int, help="label processes (default: CIM_WORKERS or all cores)")
+    args = parser.parse_args()
+
+    old_index = index_path_for(args.old_model)
+    if not os.path.exists(old_index):
+        open_index(args.old_model).close()
+    path, diff = update_index(old_index, args.model, use_hash=args.hash)
+    print(f"✅ Index written to {path}: {len(diff.added)} added, {len(diff.removed)} removed, "
+          f"{len(diff.changed)} changed")
+    if not args.no_labels:
+        with open_index(args.model, use_hash=args.hash) as model_index:
+            model = CompactModel.from_index(model_index)
+        print(f"✅ Labels written to {update_labels(args.old_model, args.model, model, diff, args.workers)}")
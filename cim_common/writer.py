@@ -0,0 +1,144 @@
+"""Streaming RDF/XML writer for reduced CIM outputs.
+
+``RdfWriter`` writes the XML declaration and an ``rdf:RDF`` root declaring
+every namespace up front, then takes elements one at a time -- raw byte
+ranges copied from a source file or ElementTree/lxml elements -- and never
+builds the output document in memory.  Every element is written with explicit
+close tags (the ``short_empty_elements=False`` form the scripts have always
+produced), and elements only use the root's prefixes, so no inline ``xmlns``
+declarations appear below the root.  An output path ending in ``.gz``,
+``.bz2``, ``.xz`` or ``.zst`` is compressed as it is written (see
+``compression``).  The document goes to a temporary file next to the output
+and only replaces it once complete, so a failed run never leaves a
+well-formed but truncated output behind.
+"""
+import os
+from contextlib import ExitStack
+from xml.sax.saxutils import escape, quoteattr
+
+from cim_common.compression import SpanReader, compression_of, open_output
+from cim_common.instrument import metrics
+from cim_common.offsets import copy_spans, expand_empty_tags
+
+XML_NS = "http://www.w3.org/XML/1998/namespace"  # the implicit xml: prefix (xml:lang, ...)
+
+
+class RdfWriter:
+    """
+    Usage::
+
+        writer = RdfWriter("output.xml", nsmap)
+        writer.add_namespaces(other_nsmap, "model.xml")
+        with writer:
+            writer.copy_spans("model.xml", spans)
+            writer.write_element(el)
+    """
+
+    def __init__(self, output_path, nsmap=None, root_tag="rdf:RDF", level=None):
+        self.output_path = output_path
+        self.root_tag = root_tag
+        self.level = level  # compression level of a .gz/.bz2/.xz/.zst output
+        self.nsmap = {}
+        self.out = None
+        self.count = 0
+        if nsmap:
+            self.add_namespaces(nsmap)
+
+    def add_namespaces(self, nsmap, source="input"):
+        """ Declare ``nsmap`` at the root; a prefix bound to two URIs is an error """
+        if self.out is not None:
+            raise RuntimeError("namespaces must be added before the header is written")
+        for prefix, uri in nsmap.items():
+            if not prefix:
+                continue
+            if self.nsmap.setdefault(prefix, uri) != uri:
+                raise ValueError(
+                    f"Prefix '{prefix}' is bound to {self.nsmap[prefix]} and to {uri} ({source})")
+
+    def _tmp_path(self):
+        suffix = compression_of(self.output_path) or ""  # keep it last: it picks the compressor
+        return f"{self.output_path[:len(self.output_path) - len(suffix)]}.tmp{suffix}"
+
+    def __enter__(self):
+        self.out = open_output(self._tmp_path(), self.level)
+        self._prefixes = {uri: prefix for prefix, uri in self.nsmap.items()}
+        decls = "".join(f" xmlns:{prefix}={quoteattr(uri)}" for prefix, uri in self.nsmap.items())
+        self.out.write(f'<?xml version="1.0" encoding="utf-8"?>\n<{self.root_tag}{decls}>\n'.encode("utf-8"))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.out.close()
+            os.remove(self._tmp_path())
+            return
+        self.out.write(f"</{self.root_tag}>\n".encode("utf-8"))
+        self.out.close()
+        os.replace(self._tmp_path(), self.output_path)
+
+    def copy_spans(self, src_path, spans):
+        """ Copy the ``(start, end)`` byte ranges of ``src_path`` as elements """
+        spans = list(spans)
+        copy_spans(src_path, spans, self.out)
+        self.count += len(spans)
+        metrics.count("elements_written", len(spans))
+
+    def write_element(self, el):
+        """ Serialize one ElementTree or lxml element with explicit close tags """
+        self.out.write(self._serialize(el, tail=False).encode("utf-8"))
+        self.out.write(b"\n")
+        self.count += 1
+        metrics.count("elements_written")
+
+    def _qname(self, tag):
+        if not tag.startswith("{"):
+            return tag
+        uri, local = tag[1:].split("}", 1)
+        prefix = self._prefixes.get(uri, "xml" if uri == XML_NS else None)
+        if prefix is None:
+            raise ValueError(f"Namespace {uri} is not declared on the output root")
+        return f"{prefix}:{local}"
+
+    def _serialize(self, el, tail=True):
+        if not isinstance(el.tag, str):  # lxml comments / processing instructions
+            return escape(el.tail or "") if tail else ""
+        tag = self._qname(el.tag)
+        attrs = "".join(f" {self._qname(k)}={quoteattr(v)}" for k, v in el.attrib.items())
+        parts = [f"<{tag}{attrs}>", escape(el.text or "")]
+        parts.extend(self._serialize(child) for child in el)
+        parts.append(f"</{tag}>")
+        if tail:
+            parts.append(escape(el.tail or ""))
+        return "".join(parts)
+
+
+def write_rdf(output_path, nsmap, sources, root_tag="rdf:RDF", level=None):
+    """
+    Write an RDF document declaring ``nsmap`` whose children are copied from
+    ``sources``: a list of ``(src_path, spans)`` pairs, written in order.
+    """
+    with RdfWriter(output_path, nsmap, root_tag, level) as writer:
+        for src_path, spans in sources:
+            writer.copy_spans(src_path, spans)
+    return writer.count
+
+
+def write_rdf_split(src_path, nsmap, outputs, root_tag="rdf:RDF", level=None):
+    """
+    Write several RDF documents declaring ``nsmap`` in one pass over
+    ``src_path``: ``outputs`` maps each output path to the ``(start, end)``
+    spans it takes.  Every span is read once, in file order, and written to
+    each output that takes it; returns ``{output path: elements written}``.
+    """
+    paths = list(outputs)
+    jobs = sorted((start, end, i) for i, path in enumerate(paths) for start, end in outputs[path])
+    with ExitStack() as stack:
+        writers = [stack.enter_context(RdfWriter(path, nsmap, root_tag, level)) for path in paths]
+        with SpanReader(src_path) as reader:
+            last, data = None, b""
+            for start, end, i in jobs:
+                if (start, end) != last:
+                    last, data = (start, end), expand_empty_tags(reader.read(start, end)) + b"\n"
+                writers[i].out.write(data)
+                writers[i].count += 1
+    metrics.count("elements_written", len(jobs))
+    return {path: writer.count for path, writer in zip(paths, writers)}
@@ -1,121 +1,66 @@
-import pandas as pd
-import xml.etree.ElementTree as ET
-from collections import deque, defaultdict
+import os
+import sys
 
-# --- Namespaces ---
-RDF_NS = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
-CIM_NS = "http://iec.ch/TC57/2006/CIM-schema-cim10#"
-ETX_NS = "http://www.ercot.com/CIM11R0/2008/2.0/extension#"
-ns = {'rdf': RDF_NS, 'cim': CIM_NS, 'etx': ETX_NS}
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from cim_common.boundary import BoundaryRegions
+from cim_common.index import open_index
+from cim_common.instrument import metrics
+from cim_common.substations import load_substations
+from cim_common.writer import write_rdf, write_rdf_split
 
-# --- Register namespaces for output ---
-ET.register_namespace('rdf', RDF_NS)
-ET.register_namespace('cim', CIM_NS)
-ET.register_namespace('etx', ETX_NS)
+group_column = None # e.g. 'ERCOT LOCATION': one output per value of the column, all from one labeling
 
-# --- Load TNMP substations from Excel ---
-df = pd.read_excel('TNMP_SUBSTATIONS.xlsx')
-#tnmp_names = df['ERCOT SUB NAME'].dropna().astype(str).tolist()
+# --- Load TNMP substations from Excel (cached next to it) ---
+with metrics.phase("load_excel"):
+    sheet = load_substations('TNMP_SUBSTATIONS.xlsx')
+#tnmp_names = sheet.names()
 
-coast_df = df[df['ERCOT LOCATION'] == 'COAST']
-tnmp_names = coast_df['ERCOT SUB NAME'].dropna().astype(str).tolist()
+tnmp_names = sheet.names(where={'ERCOT LOCATION': 'COAST'})
 
 #tnmp_name_set = {"ALVIN"}#set(tnmp_names)
 tnmp_name_set = set(tnmp_names)
 print(f"Loaded {len(tnmp_name_set)} TNMP substation names.")
 
-# --- Parse the CIM XML file ---
-tree = ET.parse(r"C:/Users/ywang2/work/CIM/NMMS_Model_CIM_Mar_ML1_1_03112025.xml")
-root = tree.getroot()
-
-# --- Build RDF ID map and reverse reference map ---
-rdf_id_map = {}
-reverse_ref_map = defaultdict(set)
-for el in root:
-    rid = el.attrib.get(f"{{{RDF_NS}}}ID")
-    if rid:
-        rdf_id_map[rid] = el
-    for child in el:
-        res = child.attrib.get(f"{{{RDF_NS}}}resource")
-        if res and res.startswith('#'):
-            reverse_ref_map[res[1:]].add(rid)
-
-# --- Identify all substations and map IDs to names ---
-all_sub_ids = set()
-sub_id_to_name = {}
-for sub in root.findall('cim:Substation', ns):
-    rid = sub.attrib.get(f"{{{RDF_NS}}}ID")
-    name_el = sub.find('cim:IdentifiedObject.name', ns)
-    name = name_el.text.strip() if name_el is not None and name_el.text else None
-    if rid and name:
-        all_sub_ids.add(rid)
-        sub_id_to_name[rid] = name
-print(f"Found {len(all_sub_ids)} total substations in the model.")
+# --- Label every element of the model with its origin substations ---
+# (interned-ID CSR reference graph loaded from the model index)
+model_file = r"C:/Users/ywang2/work/CIM/NMMS_Model_CIM_Mar_ML1_1_03112025.xml"
+with metrics.phase("open_index"):
+    model_index = open_index(model_file)
+with metrics.phase("boundary_labels"):
+    regions = BoundaryRegions(model_index)
+print(f"Found {len(regions.source_ids)} total substations in the model.")
 
 # --- Determine which substations are in TNMP ---
-tnmp_sub_ids = {sid for sid, name in sub_id_to_name.items() if name in tnmp_name_set}
+tnmp_sub_ids = regions.substation_ids(tnmp_name_set)
 print(f"TNMP substations count: {len(tnmp_sub_ids)}")
 
-# --- Multi-source BFS: label origins for each node ---
-origins = defaultdict(set)   # node_id -> set of source substation IDs
-queue = deque()
-
-# Seed BFS with every substation as its own origin
-for sid in all_sub_ids:
-    origins[sid].add(sid)
-    queue.append((sid, sid))
-
-while queue:
-    node_id, origin = queue.popleft()
-    el = rdf_id_map.get(node_id)
-    if el is None:
-        continue
-    # forward neighbors
-    neighbors = []
-    for child in el:
-        res = child.attrib.get(f"{{{RDF_NS}}}resource")
-        if res and res.startswith('#'):
-            neighbors.append(res[1:])
-    # reverse neighbors
-    neighbors.extend(reverse_ref_map.get(node_id, []))
-
-    for nbr in neighbors:
-        if origin in origins[nbr]:
-            continue
-        origins[nbr].add(origin)
-        # enqueue neighbor only if it remains single-origin
-        if len(origins[nbr]) == 1:
-            queue.append((nbr, origin))
-
-# --- Collect elements for TNMP substations ---
-final_ids = set()
-for rid, origin_set in origins.items():
-    # unique to a TNMP substation
-    if len(origin_set) == 1 and next(iter(origin_set)) in tnmp_sub_ids:
-        final_ids.add(rid)
-    # boundary elements that touch any TNMP substation
-    elif len(origin_set) > 1 and origin_set & tnmp_sub_ids:
-        final_ids.add(rid)
-
-print(f"Total elements for TNMP output: {len(final_ids)}")
-
-# --- Build output RDF tree ---
-rdf_root = ET.Element(
-    f"{{{RDF_NS}}}RDF",
-    {f"xmlns:rdf": RDF_NS, f"xmlns:cim": CIM_NS, f"xmlns:etx": ETX_NS}
-)
-rdf_root.text = '\n'
-for rid in final_ids:
-    el = rdf_id_map.get(rid)
-    if el is not None:
-        rdf_root.append(el)
-
-# --- Write reduced XML module ---
-output_file = 'tnmp_reduced_module_bfs.xml'
-ET.ElementTree(rdf_root).write(
-    output_file,
-    encoding='utf-8',
-    xml_declaration=True,
-    short_empty_elements=False
-)
-print(f"✅ Wrote '{output_file}' with {len(final_ids)} elements.")
+if group_column is None:
+    # --- Collect elements for TNMP substations ---
+    # unique to a TNMP substation, or boundary elements that touch any of them
+    with metrics.phase("select_region"):
+        final_ids = regions.region_ids(tnmp_sub_ids)
+
+    print(f"Total elements for TNMP output: {len(final_ids)}")
+
+    # --- Write reduced XML module ---
+    # elements are copied byte-for-byte from the model file, in model order
+    output_file = 'tnmp_reduced_module_bfs.xml'
+    with metrics.phase("serialize"):
+        write_rdf(output_file, model_index.nsmap, [(model_file, model_index.spans(final_ids))])
+    print(f"✅ Wrote '{output_file}' with {len(final_ids)} elements.")
+else:
+    # --- Collect elements for every group of substations, from the same labels ---
+    with metrics.phase("select_regions"):
+        groups = {value: regions.substation_ids(names)
+                  for value, names in sheet.groups(group_column).items()}
+        group_ids = regions.group_region_ids(groups)
+
+    # --- Write every regional module in one pass over the model ---
+    outputs = {}
+    for value, ids in group_ids.items():
+        suffix = "_".join(str(value).split())
+        outputs[f'tnmp_reduced_module_bfs_{suffix}.xml'] = model_index.spans(ids)
+    with metrics.phase("serialize", outputs=len(outputs)):
+        written = write_rdf_split(model_file, model_index.nsmap, outputs)
+    for output_file, count in written.items():
+        print(f"✅ Wrote '{output_file}' with {count} elements.")
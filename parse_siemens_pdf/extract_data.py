@@ -26,100 +26,97 @@ def convert_type(value):
         except ValueError:
             return value.strip('"')  # Remove quotes and keep as string
 
-def extract_rawx_sections(file_path):
+RAWX_HEADER = "RAWX Data Table Format"
+PAGE_FURNITURE = re.compile(r"^\s*(?:PSS\S*E\b.*|Siemens\b.*|\d+-\d+)\s*$")  # page headers/footers, page numbers
+_decoder = json.JSONDecoder()
+
+def _brace_depth(line, depth, in_string):
+    """ (depth, in_string) after ``line``: braces inside JSON strings do not count """
+    escaped = False
+    for ch in line:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+    return depth, in_string
+
+def _bracket_list(text, key):
+    """ Comma-separated items of the first [...] after ``key`` in ``text``, as written """
+    start = text.find(key)
+    if start < 0:
+        return []
+    start = text.find("[", start)
+    while start >= 0 and text[start + 1:].lstrip().startswith("["):  # rows: take the first one
+        start = text.find("[", start + 1)
+    end = text.find("]", start)
+    if start < 0 or end < 0:
+        return []
+    return [item.strip() for item in text[start + 1:end].split(",") if item.strip()]
+
+def _parse_table(block):
+    """ (class name, fields, sample row) of one table block; values as written in the text """
+    name, _, body = block.partition(":")
+    name = name.strip().strip('"')
+    # a table split across pages carries the page footer and header in between
+    body = "".join(line for line in body.splitlines(True) if not PAGE_FURNITURE.match(line))
+    try:
+        table, _ = _decoder.raw_decode(body.strip())
+        fields, data = table["fields"], table["data"]
+        row = data[0] if data and isinstance(data[0], list) else data
+        return name, [str(field) for field in fields], [json.dumps(value, ensure_ascii=False) for value in row]
+    except (ValueError, KeyError, TypeError, IndexError):
+        # not valid JSON even so: fall back to the bracketed lists
+        fields = [field.strip('"') for field in _bracket_list(body, '"fields"')]
+        return name, fields, _bracket_list(body, '"data"')
+
+def iter_rawx_tables(file_path):
+    """
+    Stream (class name, field names, sample data row) of every RAWX table
+    definition in ``file_path``, reading it once, a line at a time.  Data
+    values are kept as written (``convert_type`` turns them into Python).
+    """
+    state = "seek"  # seek -> header -> block
+    block = []
+    depth, in_string = 0, False
     with open(file_path, 'r', encoding='utf-8') as file:
-        lines = file.readlines()
-
-    rawx_sections = []
-    recording = False
-    current_section = []
-
-    for i, line in enumerate(lines):
-        temp = []
-        if "RAWX Data Table Format" in lines[i]:
-            i += 1
-            if '{' in lines[i]:
-                bracket_stack = 1
-                temp.append(lines[i])
-            else:
-                bracket_stack = 0
-            
-            while bracket_stack > 0:
-                i += 1
-                if '{' in lines[i]:
-                    bracket_stack += 1
-                if '}' in lines[i]:
-                    bracket_stack -= 1
-                temp.append(lines[i])
-            rawx_sections.append(temp)        
-
-    return rawx_sections
-
-def ea_formater(rawx_sections):
+        for line in file:
+            if state == "seek":
+                if RAWX_HEADER in line:
+                    state = "header"
+                continue
+            if state == "header":
+                # the table starts on the line after the header, or there is none
+                if "{" not in line:
+                    state = "seek" if RAWX_HEADER not in line else "header"
+                    continue
+                state, block, depth, in_string = "block", [], 0, False
+            block.append(line)
+            depth, in_string = _brace_depth(line, depth, in_string)
+            if depth <= 0:
+                yield _parse_table("".join(block))
+                state, block = "seek", []
+
+def ea_formater(rawx_tables):
     jsons = []
-    for i, section in enumerate(rawx_data_list, 1):
-        if len(section) == 0:
-            continue
-        class_name = section[0].split(":")[0]
-
-        # loop untile find "fields"
-        j = 0
-        while "fields" not in section[j]:
-            j += 1
-        attribute_names = []
-        while "],\n" not in section[j]:
-            if "fields" in section[j]:
-                attributes = section[j].split(":[")[1]
-            else:
-                attributes = section[j]
-            for attribute in attributes.split(','):
-                if attribute != "\n":
-                    attribute_names.append(attribute.strip())
-            j+=1
-        
-        if "fields" in section[j]:
-            attributes = section[j].split(":[")[1]
-        else:
-            attributes = section[j]
-        for attribute in attributes.split("],\n")[0].split(","):
-            if attribute != "\n":
-                attribute_names.append(attribute.strip())
+    for i, (class_name, attribute_names, data) in enumerate(rawx_tables, 1):
         print("class_name: ", class_name)
         print(attribute_names)
-
-         # loop untile find "data"
-        j += 1
-        data = []
-        if "data" in section[j]:
-            j += 1
-        while "]" not in section[j]:
-            if "[" in section[j]:
-                for d in section[j].split('[')[1].split(','):
-                    if d != "\n":
-                        data.append(d.strip())
-            else:
-                for d in section[j].split(','):
-                    if d != "\n":
-                        data.append(d.strip())
-            j += 1
-        # '],' in section[j]:
-        if "[" in section[j]:
-            data_string = section[j].split('[')[1]
-        else:
-            data_string = section[j]
-        for d in data_string.split(']')[0].split(','):
-            if d != "\n":
-                data.append(d.strip())
         print(data)
         data_types = [type(convert_type(element)) for element in data]
         print(data_types)
-        print(data[0], type(data[0]))
 
         print((len(data) == len(attribute_names)), len(data) ,len(attribute_names))
         if len(data) != len(attribute_names):
-            print(f"RAWX Section {i}:")
-            for part in section:
-                print(part)
+            print(f"RAWX Section {i}: fields and sample data do not line up")
             print("\n" + "="*50 + "\n")
         if len(data) == len(attribute_names):
             jsons.append((class_name, data, attribute_names))
@@ -163,8 +160,8 @@ def extract_json_after_rawx(file_path):
     return extracted_data
 
 file_path = "DataFormats.txt"
-rawx_data_list = extract_rawx_sections(file_path)
-formated_data = ea_formater(rawx_data_list)
+rawx_tables = iter_rawx_tables(file_path)
+formated_data = ea_formater(rawx_tables)
 json_format = convert_to_json_structure(formated_data)
 print(json.dumps(json_format, indent=4))
 file_path = "output.json"
@@ -172,10 +169,8 @@ file_path = "output.json"
 # Write to a file with indentation for readability
 with open(file_path, "w", encoding="utf-8") as json_file:
     json.dump(json_format, json_file, indent=4)
-# for i, section in enumerate(rawx_data_list, 1):
-#     print(f"RAWX Section {i}:")
-#     for part in section:
-#         print(part)
+# for i, table in enumerate(iter_rawx_tables("DataFormats.txt"), 1):
+#     print(f"RAWX Section {i}:", table)
 #     print("\n" + "="*50 + "\n")
 
 
@@ -0,0 +1,213 @@
+"""Load PSS/E RAWX case files into NumPy structured arrays, typed by output.json.
+
+``extract_data.py`` writes the RAWX table schema (class name, attribute names
+and ``infer_type`` types) to ``output.json``.  ``load_rawx`` streams a RAWX
+case through that schema: each table's ``data`` rows -- one row per line, as
+PSS/E writes them -- are gathered a batch at a time and parsed by NumPy's C
+reader straight into a structured array (int -> int64, float and None ->
+float64, char -> fixed-width str), so no Python object is made per cell.
+``null`` reads as NaN, or INT_MISSING in int columns.  Fields the schema
+does not know are read as str.
+
+The arrays are saved next to the case as ``<case>.arrays/<table>.npy`` and
+reopened memory-mapped while the case file and the schema are unchanged::
+
+    tables = load_rawx("ERCOT_case.rawx")
+    tables["bus"]["baskv"]
+
+    python load_rawx.py ERCOT_case.rawx --schema output.json
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import re
+
+import numpy as np
+
+SCHEMA_FILE = "output.json"
+BATCH_ROWS = 1 << 14
+CACHE_VERSION = "1"
+INT_MISSING = np.iinfo(np.int64).min
+NUMPY_TYPES = {"int": np.int64, "float": np.float64, "None": np.float64}
+
+TABLE_START = re.compile(r'^\s*"(\w+)"\s*:\s*\{')
+FIELDS = re.compile(r'"fields"\s*:\s*\[')
+DATA = re.compile(r'"data"\s*:\s*\[')
+# quoted strings pass through (JSON escapes aside); outside them ``null``
+# becomes nan and the blanks before a quote go (NumPy only sees a quote that
+# starts its field)
+TOKEN = re.compile(r'("(?:[^"\\]|\\.)*")|(\bnull\b)|,\s+(?=")')
+
+
+def load_schema(path=SCHEMA_FILE):
+    """ {table: {attribute: type}} from extract_data.py's output.json """
+    with open(path, encoding="utf-8") as f:
+        return {table["name"]: {attr["name"]: attr["type"] for attr in table["attributes"]}
+                for table in json.load(f)}
+
+
+def _dtype(fields, types, width):
+    return np.dtype([(field, NUMPY_TYPES.get(types.get(field), f"U{width}")) for field in fields])
+
+
+def _to_int(token):
+    token = token.strip()
+    if token in ("nan", ""):
+        return INT_MISSING
+    return int(float(token))
+
+
+def _rewrite(m):
+    quoted = m.group(1)
+    if quoted:
+        if "\\" not in quoted:
+            return quoted
+        return '"' + json.loads(quoted).replace('"', '""') + '"'  # NumPy's escape is a doubled quote
+    return "nan" if m.group(2) else ","
+
+
+def _parse_rows(rows, fields, types):
+    """ Structured array of the comma-separated ``rows`` (brackets already stripped) """
+    width = max(map(len, rows))  # no str field is longer than its line
+    dtype = _dtype(fields, types, width)
+    text = TOKEN.sub(_rewrite, "\n".join(rows))
+    try:
+        return np.loadtxt(io.StringIO(text), delimiter=",", quotechar='"', dtype=dtype, ndmin=1)
+    except ValueError:
+        # null (or a float) in an int column: only these columns go through Python
+        converters = {i: _to_int for i, field in enumerate(fields) if dtype[field] == np.int64}
+        return np.loadtxt(io.StringIO(text), delimiter=",", quotechar='"', dtype=dtype, ndmin=1,
+                          converters=converters)
+
+
+def _concat(batches, fields, types):
+    """ One array of the ``batches``, str fields narrowed to their longest value """
+    widths = {}
+    for field in fields:
+        if types.get(field) not in NUMPY_TYPES:
+            lengths = [int(np.char.str_len(batch[field]).max()) for batch in batches if len(batch)]
+            widths[field] = max(lengths + [1])
+    dtype = np.dtype([(field, NUMPY_TYPES[types[field]] if field not in widths else f"U{widths[field]}")
+                      for field in fields])
+    out = np.empty(sum(len(batch) for batch in batches), dtype=dtype)
+    pos = 0
+    for batch in batches:
+        for field in fields:
+            # unquoted values keep the blank after their comma
+            out[field][pos:pos + len(batch)] = np.char.lstrip(batch[field]) if field in widths else batch[field]
+        pos += len(batch)
+    return out
+
+
+def read_rawx(case_path, schema):
+    """ {table: structured array} of every table in the RAWX file ``case_path`` """
+    tables = {}
+    table = fields = None
+    rows, batches = [], []
+    pending = None  # a "fields" list still open at the end of a line
+
+    def finish():
+        if rows:
+            batches.append(_parse_rows(rows, fields, schema.get(table, {})))
+            rows.clear()
+        tables[table] = _concat(batches, fields, schema.get(table, {}))
+        batches.clear()
+
+    with open(case_path, encoding="utf-8") as f:
+        in_data = False
+        for line in f:
+            if in_data:
+                stripped = line.strip()
+                if stripped.startswith("["):
+                    rows.append(stripped[1:stripped.rindex("]")].lstrip())
+                    if len(rows) >= BATCH_ROWS:
+                        batches.append(_parse_rows(rows, fields, schema.get(table, {})))
+                        rows.clear()
+                elif stripped.startswith("]"):
+                    in_data = False
+                    finish()
+                continue
+
+            if pending is not None:
+                pending += line
+                if "]" in line:
+                    fields, pending = json.loads(pending[:pending.rindex("]") + 1]), None
+                continue
+            m = TABLE_START.match(line)
+            if m:
+                table, fields = m.group(1), None
+            m = FIELDS.search(line)
+            if m:
+                text = line[m.end() - 1:]
+                if "]" not in text:
+                    pending = text
+                    continue
+                fields = json.loads(text[:text.index("]") + 1])
+            m = DATA.search(line)
+            if m and fields is not None:
+                rest = line[m.end():].strip()
+                if not rest:
+                    in_data = True  # one row per line follows
+                elif rest.startswith("["):
+                    # compact rows on one line: decode them as JSON
+                    data, _ = json.JSONDecoder().raw_decode("[" + rest)
+                    rows.extend(json.dumps(row, ensure_ascii=False)[1:-1] for row in data)
+                    finish()
+                else:
+                    rows.append(rest[:rest.rindex("]")])  # a single-row table (caseid, ...)
+                    finish()
+    return tables
+
+
+def cache_dir_for(case_path):
+    return f"{case_path}.arrays"
+
+
+def _cache_key(case_path, schema_path):
+    stat = os.stat(case_path)
+    with open(schema_path, "rb") as f:
+        schema_hash = hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+    return {"version": CACHE_VERSION, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "schema": schema_hash}
+
+
+def load_rawx(case_path, schema_path=SCHEMA_FILE, cache=True):
+    """
+    {table: structured array} of ``case_path``: memory-mapped from its cache
+    when that is still valid, else read (and, with ``cache``, saved).
+    """
+    if not cache:
+        return read_rawx(case_path, load_schema(schema_path))
+    key = _cache_key(case_path, schema_path)
+    cache_dir = cache_dir_for(case_path)
+    meta_path = os.path.join(cache_dir, "meta.json")
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["key"] == key:
+            return {table: np.load(os.path.join(cache_dir, f"{table}.npy"), mmap_mode="r")
+                    for table in meta["tables"]}
+    except (OSError, ValueError, KeyError):
+        pass
+
+    tables = read_rawx(case_path, load_schema(schema_path))
+    os.makedirs(cache_dir, exist_ok=True)
+    for table, array in tables.items():
+        np.save(os.path.join(cache_dir, f"{table}.npy"), array)
+    with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"key": key, "tables": list(tables)}, f)
+    os.replace(meta_path + ".tmp", meta_path)
+    return tables
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load a PSS/E RAWX case into NumPy arrays typed by output.json.")
+    parser.add_argument("case", help="RAWX case file")
+    parser.add_argument("--schema", default=SCHEMA_FILE, help="table schema written by extract_data.py")
+    parser.add_argument("--no-cache", action="store_true", help="read the case even if its arrays are cached")
+    args = parser.parse_args()
+
+    tables = load_rawx(args.case, args.schema, cache=not args.no_cache)
+    for table, array in tables.items():
+        print(f"{table}: {len(array)} rows, {len(array.dtype.names)} fields")
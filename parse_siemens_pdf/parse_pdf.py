@@ -1,12 +1,131 @@
+import hashlib
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
 from PyPDF2 import PdfReader
+from PyPDF2.generic import ArrayObject, DictionaryObject, IndirectObject, StreamObject
+
+pdf_file = "DataFormats.pdf"
+text_file = "DataFormats.txt"
+cache_file = pdf_file + ".pages.pkl"  # page text keyed by the hash of each page's content and resources
+pages_per_task = 16
+
+
+def file_hash(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _feed(digest, obj, seen):
+    """ Add the PDF object ``obj`` to ``digest``, following indirect references once each """
+    if isinstance(obj, IndirectObject):
+        key = (obj.idnum, obj.generation)
+        if key in seen:  # by visiting order, not object number, which a revision may change
+            digest.update(b"@%d" % seen[key])
+        else:
+            seen[key] = len(seen)
+            _feed(digest, obj.get_object(), seen)
+    elif isinstance(obj, StreamObject):
+        _feed(digest, DictionaryObject(obj), seen)
+        digest.update(obj.get_data())
+    elif isinstance(obj, DictionaryObject):
+        for name in sorted(obj):
+            if name != "/Parent":
+                digest.update(name.encode())
+                _feed(digest, obj.raw_get(name), seen)
+    elif isinstance(obj, ArrayObject):
+        digest.update(b"[")
+        for item in obj:
+            _feed(digest, item, seen)
+        digest.update(b"]")
+    else:
+        digest.update(repr(obj).encode())
+
+
+def page_hash(page):
+    """
+    Hash of what the page's text is extracted from: its content stream and
+    its /Resources (fonts and their encodings, form XObjects)
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    contents = page.get_contents()
+    digest.update(contents.get_data() if contents is not None else b"")
+    _feed(digest, page.get("/Resources"), {})
+    return digest.hexdigest()
+
+
+def load_cache(path):
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return {"pdf_hash": None, "page_hashes": [], "texts": {}}
+
+
+def save_cache(path, cache):
+    with open(path + ".tmp", "wb") as f:
+        pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(path + ".tmp", path)
+
+
+def extract_pages(task):
+    """ [(page index, text)] of the pages ``indexes`` of the PDF, in one worker """
+    path, indexes = task
+    reader = PdfReader(path)
+    return [(i, reader.pages[i].extract_text()) for i in indexes]
+
+
+def main():
+    cache = load_cache(cache_file)
+    texts = cache["texts"]
+
+    # --- Page hashes: reused as a whole while the PDF is unchanged ---
+    pdf_hash = file_hash(pdf_file)
+    if cache["pdf_hash"] == pdf_hash:
+        hashes = cache["page_hashes"]
+    else:
+        hashes = [page_hash(page) for page in PdfReader(pdf_file).pages]
+
+    # --- Extract only the pages not cached yet, in page ranges across a process pool ---
+    todo = [i for i, h in enumerate(hashes) if h not in texts]
+    tasks = [(pdf_file, todo[i:i + pages_per_task]) for i in range(0, len(todo), pages_per_task)]
+    print(f"{len(hashes)} pages, {len(hashes) - len(todo)} from the cache, {len(todo)} to extract")
+
+    # --- Stream the page texts to the output in page order as the ranges finish ---
+    written = 0
+    with open(text_file, "w", encoding="utf-8") as file:
+        def write_until(end):
+            nonlocal written
+            while written < end:
+                file.write(texts[hashes[written]])
+                written += 1
+
+        if len(tasks) > 1:
+            pool = ProcessPoolExecutor(min(len(tasks), os.cpu_count() or 1))
+            results = pool.map(extract_pages, tasks)
+        else:
+            pool = None
+            results = map(extract_pages, tasks)
+        try:
+            for pages in results:
+                write_until(pages[0][0])
+                for i, text in pages:
+                    texts[hashes[i]] = text
+                write_until(pages[-1][0] + 1)
+            write_until(len(hashes))
+        finally:
+            if pool is not None:
+                pool.shutdown()
 
-# Load the PDF file
-reader = PdfReader("DataFormats.pdf")
-text = ""
+    # keep only the pages of this revision
+    save_cache(cache_file, {"pdf_hash": pdf_hash, "page_hashes": hashes,
+                            "texts": {h: texts[h] for h in hashes}})
+    print(f"✅ Text written to {text_file}")
 
-# Extract text from each page
-for page in reader.pages:
-    text += page.extract_text()
 
-with open("DataFormats.txt", "w", encoding = "utf-8") as file:
-    file.write(text)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import os
+import re
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from benchmarks.generate_synthetic_cim import _element, generate, write_delete_file  # noqa: E402
+
+ELEMENTS = 3000
+
+
+def _drop(text, cls, rdf_id):
+    return re.sub(rf'<{cls} rdf:ID="{rdf_id}">.*?</{cls}>\n', "", text, count=1, flags=re.S)
+
+
+@pytest.fixture(scope="session")
+def model_path(tmp_path_factory):
+    """ A small synthetic NMMS-shaped model """
+    path = str(tmp_path_factory.mktemp("model") / "model.xml")
+    generate(path, ELEMENTS, seed=1)
+    return path
+
+
+@pytest.fixture(scope="session")
+def delete_path(model_path):
+    path = model_path.replace("model.xml", "delete.xml")
+    write_delete_file(path, n_subs=40, count=20, seed=1)
+    return path
+
+
+@pytest.fixture(scope="session")
+def next_model_path(model_path, tmp_path_factory):
+    """ ``model_path`` as next month's model: elements removed, changed and added """
+    with open(model_path, encoding="utf-8") as f:
+        text = f.read()
+    text = _drop(text, "cim:ACLineSegment", "_L3_0")
+    text = _drop(text, "cim:Disconnector", "_DS7_1_2")
+    text = text.replace('<cim:Terminal.ConnectivityNode rdf:resource="#_CN5_0_0"/>',
+                        '<cim:Terminal.ConnectivityNode rdf:resource="#_CN9_0_1"/>', 1)
+    text = text.replace(">SUB000002<", ">SUB000002_RENAMED<", 1)
+    added = (_element("cim:ACLineSegment", "_LNEW", [("cim:IdentifiedObject.name", "LNEW")],
+                      [("cim:Equipment.MemberOf_EquipmentContainer", "_S1")])
+             + _element("cim:Terminal", "_T_LNEWa", [], [("cim:Terminal.ConductingEquipment", "_LNEW"),
+                                                        ("cim:Terminal.ConnectivityNode", "_CN1_0_0")])
+             + _element("cim:Terminal", "_T_LNEWb", [], [("cim:Terminal.ConductingEquipment", "_LNEW"),
+                                                        ("cim:Terminal.ConnectivityNode", "_CN30_0_2")]))
+    text = text.replace("</rdf:RDF>", added + "</rdf:RDF>")
+    path = str(tmp_path_factory.mktemp("next") / "model.xml")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return path
@@ -0,0 +1,28 @@
+import random
+
+from cim_common.closure import ClosureCache, read_delete_file, reference_closure
+from cim_common.index import open_index
+from cim_common.store import load_compact
+
+
+def test_cached_closure_matches_bfs_for_delete_file(model_path, delete_path):
+    existing_ids, referenced_ids = read_delete_file(delete_path)
+    missing_ids = referenced_ids - existing_ids
+    closures = ClosureCache(load_compact(model_path), cache=False)
+    with open_index(model_path) as model_index:
+        expected = reference_closure(model_index, existing_ids, missing_ids, verbose=False)
+    assert closures.reference_closure(existing_ids, missing_ids) == expected
+    assert expected[0]
+
+
+def test_cached_closure_matches_bfs_for_random_sets(model_path):
+    model = load_compact(model_path)
+    closures = ClosureCache(model, cache=False)
+    ids = model.ids.to_ids(range(model.n_defined))
+    rng = random.Random(3)
+    with open_index(model_path) as model_index:
+        for _ in range(20):
+            existing_ids = set(rng.sample(ids, 30))
+            missing_ids = set(rng.sample(ids, 5)) | {"_NOT_IN_MODEL"}
+            assert (closures.reference_closure(existing_ids, missing_ids)
+                    == reference_closure(model_index, existing_ids, missing_ids, verbose=False))
@@ -0,0 +1,77 @@
+import json
+import math
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "parse_siemens_pdf"))
+from load_rawx import INT_MISSING, load_rawx  # noqa: E402
+
+SCHEMA = [
+    {"name": "caseid", "stereotype": "TNP",
+     "attributes": [{"name": "ic", "type": "int"}, {"name": "sbase", "type": "float"},
+                    {"name": "title1", "type": "char"}]},
+    {"name": "bus", "stereotype": "TNP",
+     "attributes": [{"name": "ibus", "type": "int"}, {"name": "name", "type": "char"},
+                    {"name": "baskv", "type": "float"}, {"name": "ide", "type": "int"}]},
+    {"name": "area", "stereotype": "TNP",
+     "attributes": [{"name": "iarea", "type": "int"}, {"name": "arname", "type": "char"}]},
+]
+
+CASE = '''{
+  "network":{
+    "caseid":{
+      "fields":["ic", "sbase", "title1"],
+      "data":[0, 100.00, "CASE {A}"]
+    },
+    "bus":{
+      "fields":["ibus", "name",
+        "baskv", "ide"],
+      "data":[
+        [1, "BUS, 1", 138.0, 1],
+        [2, "null line", null, 2],
+        [3, "A, \\"B\\"", 345.0, null],
+        [4,"x,  \\"y\\" null",69.0,3]
+      ]
+    },
+    "area":{"fields":["iarea", "arname"], "data":[[1, "NORTH"], [2, "CO, AST"]]}
+  }
+}
+'''
+
+
+def _case(tmp_path):
+    case_path = tmp_path / "case.rawx"
+    case_path.write_text(CASE, encoding="utf-8")
+    schema_path = tmp_path / "output.json"
+    schema_path.write_text(json.dumps(SCHEMA), encoding="utf-8")
+    return str(case_path), str(schema_path)
+
+
+def test_quoted_null_and_comma_values(tmp_path):
+    case_path, schema_path = _case(tmp_path)
+    tables = load_rawx(case_path, schema_path, cache=False)
+    reference = json.loads(CASE)["network"]
+
+    bus = tables["bus"]
+    assert bus["name"].tolist() == [row[1] for row in reference["bus"]["data"]]
+    assert bus["ibus"].tolist() == [1, 2, 3, 4]
+    assert bus["ide"].tolist() == [1, 2, INT_MISSING, 3]
+    baskv = bus["baskv"].tolist()
+    assert math.isnan(baskv[1]) and baskv[:1] + baskv[2:] == [138.0, 345.0, 69.0]
+
+    assert tables["caseid"]["title1"].tolist() == ["CASE {A}"]
+    assert tables["caseid"]["sbase"].tolist() == [100.0]
+    assert tables["area"]["arname"].tolist() == ["NORTH", "CO, AST"]
+
+
+def test_cached_arrays_match(tmp_path):
+    case_path, schema_path = _case(tmp_path)
+    read = load_rawx(case_path, schema_path)
+    cached = load_rawx(case_path, schema_path)
+    assert set(cached) == set(read)
+    for table, array in read.items():
+        assert isinstance(cached[table], np.memmap)
+        assert cached[table].dtype == array.dtype
+        assert cached[table].tobytes() == array.tobytes()
@@ -0,0 +1,10 @@
+from cim_common.parallel import records_with_spans
+
+
+def test_parallel_records_match_serial(model_path):
+    serial_nsmap, parallel_nsmap = {}, {}
+    serial = list(records_with_spans(model_path, serial_nsmap, workers=1))
+    parallel = list(records_with_spans(model_path, parallel_nsmap, workers=3))
+    assert len(serial) > 1000
+    assert parallel == serial
+    assert parallel_nsmap == serial_nsmap
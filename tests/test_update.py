@@ -0,0 +1,58 @@
+import sqlite3
+
+import numpy as np
+
+from cim_common.boundary import substation_names
+from cim_common.graph import label_origins
+from cim_common.index import build_index, open_index
+from cim_common.instrument import metrics
+from cim_common.labels import compute_labels, repair_labels
+from cim_common.store import load_compact
+from cim_common.update import update_index
+
+
+def _contents(index_path):
+    conn = sqlite3.connect(index_path)
+    try:
+        return {
+            "elements": conn.execute("SELECT * FROM elements ORDER BY idx").fetchall(),
+            "refs": conn.execute("SELECT * FROM refs ORDER BY rowid").fetchall(),
+            "nsmap": sorted(conn.execute("SELECT * FROM nsmap")),
+            "version": conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchall(),
+        }
+    finally:
+        conn.close()
+
+
+def test_update_index_matches_fresh_build(model_path, next_model_path, tmp_path):
+    with open_index(model_path) as old_index:
+        old_index_path = old_index.index_path
+    updated, diff = update_index(old_index_path, next_model_path, str(tmp_path / "updated.sqlite"))
+    fresh = build_index(next_model_path, str(tmp_path / "fresh.sqlite"), workers=1)
+    assert _contents(updated) == _contents(fresh)
+    assert diff.added == {"_LNEW", "_T_LNEWa", "_T_LNEWb"}
+    assert diff.removed == {"_L3_0", "_DS7_1_2"}
+    assert len(diff.changed) == 2  # the rewired terminal and the renamed substation
+
+
+def _labels(model):
+    graph = model.graph()
+    return graph, sorted(substation_names(model))
+
+
+def test_repair_labels_matches_full_labeling(model_path, next_model_path):
+    old_graph, old_sources = _labels(load_compact(model_path))
+    old = compute_labels(old_graph, old_sources, workers=1)
+
+    model = load_compact(next_model_path)
+    with open_index(model_path) as old_index:
+        _, diff = update_index(old_index.index_path, next_model_path)
+    graph, sources = _labels(model)
+    for workers in (1, 3):
+        reused = metrics.counters["components_reused"]
+        repaired = repair_labels(old, graph, sources,
+                                 diff.added | diff.removed | diff.changed | diff.touched, workers)
+        assert metrics.counters["components_reused"] > reused  # the repair did not redo everything
+        label, boundary = label_origins(graph, graph.nodes(sources))
+        assert np.array_equal(repaired.label, label)
+        assert repaired.boundary == boundary